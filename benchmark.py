@@ -0,0 +1,332 @@
+import os
+import math
+import time
+import argparse
+import numpy as np
+import xml.etree.ElementTree as ET
+from dm.program_space import ProgramSpace
+from dm.factor.srcml import srcml
+from dm.doe import data_file
+from dm.doe.covering_doe_manager import CoveringDoEManager, get_uncovered_tuples
+from dm.doe.one2nhot_doe_manager import One2NHotDoEManager
+from dm.doe.random_doe_manager import RandomDoEManager
+from dm.factor.factor_manager import FactorManager
+
+
+def get_parser():
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    emitter_parser = subparsers.add_parser(
+        "emitter", help="Check and time the native srcML emitter against srcml"
+    )
+    emitter_parser.add_argument(
+        "-p", "--proj_names", help="Target project names", nargs="+", default=["mbe", "mug", "wc"]
+    )
+    emitter_parser.add_argument(
+        "--max_variants",
+        help="Maximum number of one-deleted variants checked per file",
+        type=int,
+        default=100,
+    )
+    emitter_parser.set_defaults(func=bench_emitter)
+
+    startup_parser = subparsers.add_parser(
+        "startup", help="Time the mapping of the ORBS log nodes to the stmt nodes on startup"
+    )
+    startup_parser.add_argument(
+        "--stmts", help="Number of the stmt nodes of the synthetic file", type=int, default=1000
+    )
+    startup_parser.set_defaults(func=bench_startup)
+
+    data_load_parser = subparsers.add_parser(
+        "data_load", help="Time the loading of synthetic observations in CSV and packed bits"
+    )
+    data_load_parser.add_argument("--rows", help="Number of rows", type=int, default=1000000)
+    data_load_parser.add_argument("--factors", help="Number of factors", type=int, default=100)
+    data_load_parser.add_argument("--tests", help="Number of tests", type=int, default=10)
+    data_load_parser.add_argument("--shards", help="Number of files", type=int, default=10)
+    data_load_parser.add_argument(
+        "--data_dir", help="Directory of the synthetic files", default="output/benchmark/data_load"
+    )
+    data_load_parser.set_defaults(func=bench_data_load)
+
+    covering_parser = subparsers.add_parser(
+        "covering", help="Compare the covering designs with the nhot ones of synthetic factors"
+    )
+    covering_parser.add_argument(
+        "--factors", help="Numbers of factors", type=int, nargs="+", default=[100, 1000, 5000]
+    )
+    covering_parser.add_argument(
+        "--strength", help="Strength of the covering arrays", type=int, choices=[2, 3], default=2
+    )
+    covering_parser.add_argument(
+        "--max_nhot_runs",
+        help="Maximum number of the nhot runs generated (only counted beyond)",
+        type=int,
+        default=100000,
+    )
+    covering_parser.set_defaults(func=bench_covering)
+
+    random_parser = subparsers.add_parser(
+        "random", help="Time the random designs of synthetic factors"
+    )
+    random_parser.add_argument("--factors", help="Number of factors", type=int, default=5000)
+    random_parser.add_argument("--rows", help="Number of distinct rows", type=int, default=100000)
+    random_parser.add_argument(
+        "--thresholds",
+        help="Deletion probabilities (1 / factors if 0)",
+        type=float,
+        nargs="+",
+        default=[0.0, 0.01, 0.3],
+    )
+    random_parser.add_argument(
+        "--stratify", help="Stratify the deletion counts", action="store_true"
+    )
+    random_parser.set_defaults(func=bench_random)
+    return parser
+
+
+def bench_emitter(args):
+    """
+    srcml.xml_to_code has to generate the same code as the srcml binary, for
+    the whole files (w/ and w/o position) and for the one-deleted variants.
+    """
+    check_cnt, mismatch_cnt = 0, 0
+    native_time, srcml_time = 0.0, 0.0
+    for proj_name in args.proj_names:
+        program_space = ProgramSpace(proj_name)
+        for filename in program_space.files:
+            original_filename = (
+                ".".join(filename.split(".")[:-1]) + "_original." + filename.split(".")[-1]
+            )
+            for name in [filename, original_filename]:
+                code_path = os.path.join(program_space.orig_dir, name)
+                with open(code_path, "rb") as f:
+                    code = f.read()
+                for pos_flag in [False, True]:
+                    tree = srcml.code_to_xml(code_path, pos_flag)
+                    trees = [("whole", tree)]
+                    _, stmt_list = srcml.get_parent_dict_and_stmt(tree)
+                    for idx in range(min(len(stmt_list), args.max_variants)):
+                        copy_tree, _ = srcml.copy_tree(tree)
+                        parent_dict, copy_stmt_list = srcml.get_parent_dict_and_stmt(copy_tree)
+                        stmt_node = copy_stmt_list[idx]
+                        srcml.delete_node(parent_dict[stmt_node], stmt_node)
+                        trees.append(("deleted {}".format(idx), copy_tree))
+
+                    for variant, variant_tree in trees:
+                        start = time.perf_counter()
+                        native_code = srcml.xml_to_code(variant_tree)
+                        native_time += time.perf_counter() - start
+                        start = time.perf_counter()
+                        srcml_code = srcml.xml_to_code_srcml(variant_tree)
+                        srcml_time += time.perf_counter() - start
+                        check_cnt += 1
+                        if native_code != srcml_code or (
+                            variant == "whole" and native_code != code
+                        ):
+                            mismatch_cnt += 1
+                            print(
+                                "Mismatch: {} {} (position: {}, {})".format(
+                                    proj_name, name, pos_flag, variant
+                                )
+                            )
+
+    print("checked: {}, mismatch: {}".format(check_cnt, mismatch_cnt))
+    print(
+        "native: {:.3f}s ({:.3f}ms/tree), srcml: {:.3f}s ({:.3f}ms/tree)".format(
+            native_time,
+            1000 * native_time / max(check_cnt, 1),
+            srcml_time,
+            1000 * srcml_time / max(check_cnt, 1),
+        )
+    )
+    return mismatch_cnt == 0
+
+
+def get_synthetic_tree(stmt_cnt):
+    """
+    srcML tree (w/ position) of a function with stmt_cnt expr stmts, one per line
+    """
+    src_ns, pos_ns = srcml.NS["ns"], srcml.NS["pos"]
+    stmts = "".join(
+        '<expr_stmt pos:line="{0}" pos:column="5"><expr pos:line="{0}" pos:column="5">'
+        '<call pos:line="{0}" pos:column="5"><name pos:line="{0}" pos:column="5">f</name>'
+        '<argument_list pos:line="{0}" pos:column="6">()<pos:position pos:line="{0}" '
+        'pos:column="7"/></argument_list></call></expr>;</expr_stmt>\n    '.format(line)
+        for line in range(2, stmt_cnt + 2)
+    )
+    xml = (
+        '<unit xmlns="{}" xmlns:pos="{}"><function pos:line="1" pos:column="1">'
+        "<type><name>void</name></type> <name>g</name><parameter_list>()</parameter_list> "
+        "<block>{{<block_content>\n    {}</block_content>}}</block></function>\n</unit>"
+    ).format(src_ns, pos_ns, stmts)
+    return ET.ElementTree(ET.fromstring(xml))
+
+
+def bench_startup(args):
+    """
+    Map every stmt node of a synthetic file, found by its (line, col), to the
+    same stmt node in the copy of the tree w/o position, as get_log_dict
+    does for the ORBS log nodes: tree scans vs indices.
+    """
+    tree = get_synthetic_tree(args.stmts)
+    positions = [(line, 5) for line in range(2, args.stmts + 2)]
+    # Plays the tree w/o ORBS log nodes
+    target_tree, _ = srcml.copy_tree(tree)
+    srcml.remove_position(target_tree)
+
+    start = time.perf_counter()
+    parent_dict, _ = srcml.get_parent_dict_and_stmt(tree)
+    tree_wo_pos, wopos_to_pos_mapping = srcml.copy_tree(tree)
+    pos_to_wopos_mapping = {node: copy_node for copy_node, node in wopos_to_pos_mapping.items()}
+    srcml.remove_position(tree_wo_pos)
+    scan_result = []
+    for line, col in positions:
+        var_node = srcml.get_node_by_line_col(tree, line, col)
+        stmt_node = srcml.get_parent_stmt_node(var_node, parent_dict)
+        stmt_node_index = srcml.get_node_index_in_tree(tree_wo_pos, pos_to_wopos_mapping[stmt_node])
+        scan_result.append(srcml.get_node_by_index(target_tree, stmt_node_index))
+    scan_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = srcml.TreeIndex(tree)
+    line_col_dict = srcml.get_line_col_dict(tree)
+    target_node_list = srcml.get_bfs_node_list(target_tree)
+    index_result = []
+    for line, col in positions:
+        stmt_node = index.get_parent_stmt_node(line_col_dict.get((line, col)))
+        index_result.append(target_node_list[index.bfs_index(stmt_node)])
+    index_time = time.perf_counter() - start
+
+    match = all(map(lambda x: x[0] is x[1], zip(scan_result, index_result)))
+    print("stmts: {}, same mapping: {}".format(args.stmts, match))
+    print(
+        "scan: {:.3f}s, index: {:.3f}s (x{:.1f})".format(
+            scan_time, index_time, scan_time / max(index_time, 1e-9)
+        )
+    )
+    return match
+
+
+def bench_data_load(args):
+    """
+    Load the observation shards as model.get_data did (genfromtxt, and vstack
+    for every shard), and with data_file.load_data from CSV and packed bits.
+    """
+    columns = data_file.get_observation_columns(args.factors, args.tests, 1)
+    data = np.random.default_rng(0).integers(0, 2, (args.rows, len(columns)), dtype=np.uint8)
+    shard_paths = {"csv": [], "bits": []}
+    os.makedirs(args.data_dir, exist_ok=True)
+    for idx, shard in enumerate(np.array_split(data, args.shards)):
+        for data_format in shard_paths:
+            path = os.path.join(args.data_dir, "expr_{:04d}.{}".format(idx, data_format))
+            data_file.save_data(path, shard, columns)
+            shard_paths[data_format].append(path)
+    for data_format, paths in shard_paths.items():
+        print("{}: {:.1f}MB".format(data_format, sum(map(os.path.getsize, paths)) / (1 << 20)))
+
+    start = time.perf_counter()
+    vstack_data = np.genfromtxt(shard_paths["csv"][0], delimiter=",", skip_header=1).astype(bool)
+    for path in shard_paths["csv"][1:]:
+        vstack_data = np.vstack(
+            (vstack_data, np.genfromtxt(path, delimiter=",", skip_header=1).astype(bool))
+        )
+    results = [("genfromtxt + vstack", time.perf_counter() - start, vstack_data)]
+    for data_format, paths in shard_paths.items():
+        start = time.perf_counter()
+        loaded = np.concatenate([data_file.load_data(path)[2][:].view(bool) for path in paths])
+        results.append(("load_data " + data_format, time.perf_counter() - start, loaded))
+
+    match = True
+    for name, load_time, loaded in results:
+        same = np.array_equal(loaded, data.view(bool))
+        match = match and same
+        print("{}: {:.3f}s, same data: {}".format(name, load_time, same))
+    return match
+
+
+class SyntheticFactorManager(FactorManager):
+    """
+    size factors, with no revision and all valid
+    """
+
+    def __init__(self, size):
+        self._factor = None
+        self._size = size
+
+    def create_program(self, factor, iter_cnt, save_flag, only_code=False, work_name="work"):
+        raise Exception("Invalid call(create_program) on synthetic factors")
+
+
+def get_plan_rows(doe_manager):
+    return doe_manager._plan.exhaust().rows().unpack()
+
+
+def bench_covering(args):
+    """
+    Generate the covering array of every number of factors, check that it
+    covers every tuple, and compare it with nhot (max_n = strength).
+    """
+    match = True
+    for factor_size in args.factors:
+        factor_manager = SyntheticFactorManager(factor_size)
+        start = time.perf_counter()
+        doe_manager = CoveringDoEManager(factor_manager, None, 0, args.strength)
+        rows = get_plan_rows(doe_manager)
+        covering_time = time.perf_counter() - start
+        covered = len(get_uncovered_tuples(rows, args.strength)[0]) == 0
+        match = match and covered
+        print(
+            "factors: {}, covering: {} runs, {:.3f}s, covers every tuple: {}".format(
+                factor_size, len(rows), covering_time, covered
+            )
+        )
+
+        nhot_cnt = 1 + sum(math.comb(factor_size, n) for n in range(1, args.strength + 1))
+        if nhot_cnt > args.max_nhot_runs:
+            print("factors: {}, nhot: {} runs (not generated)".format(factor_size, nhot_cnt))
+            continue
+        start = time.perf_counter()
+        doe_manager = One2NHotDoEManager(factor_manager, None, 0, args.strength)
+        nhot_rows = get_plan_rows(doe_manager)
+        nhot_time = time.perf_counter() - start
+        print("factors: {}, nhot: {} runs, {:.3f}s".format(factor_size, len(nhot_rows), nhot_time))
+    return match
+
+
+def bench_random(args):
+    """
+    Generate the random design of every threshold, and check that its rows
+    are distinct and delete the factors with the threshold on average.
+    """
+    match = True
+    factor_manager = SyntheticFactorManager(args.factors)
+    for threshold in args.thresholds:
+        if threshold == 0.0:
+            threshold = 1 / args.factors
+        start = time.perf_counter()
+        doe_manager = RandomDoEManager(
+            factor_manager, None, args.rows, threshold, seed=1, stratify=args.stratify
+        )
+        rows = get_plan_rows(doe_manager)
+        random_time = time.perf_counter() - start
+        counts = np.asarray(doe_manager._plan.counts())
+        rate = np.sum(rows.sum(axis=1) * counts) / counts.sum() / args.factors
+        distinct = len(np.unique(np.packbits(rows, axis=1), axis=0)) == len(rows)
+        match = match and distinct and len(rows) == args.rows
+        print(
+            "threshold: {:.5f}, random: {} runs ({} sampled), {:.3f}s, "
+            "deletion rate: {:.5f}, distinct: {}".format(
+                threshold, len(rows), counts.sum(), random_time, rate, distinct
+            )
+        )
+    return match
+
+
+if __name__ == "__main__":
+    parser = get_parser()
+    args = parser.parse_args()
+    if not args.func(args):
+        exit(1)
@@ -0,0 +1,36 @@
+import os
+import argparse
+from dm.doe import data_file
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        description="Convert plan and observation files between CSV and packed bits (.bits)"
+    )
+    parser.add_argument("paths", help="Files to convert (.csv or .bits)", nargs="+")
+    parser.add_argument(
+        "--remove", help="Remove the original files", action="store_true", default=False
+    )
+    return parser
+
+
+def convert(path, remove=False):
+    stem, ext = os.path.splitext(path)
+    if ext == ".csv":
+        output_path = stem + ".bits"
+    elif ext == ".bits":
+        output_path = stem + ".csv"
+    else:
+        raise Exception("Invalid data file({})".format(path))
+    columns, counts, rows = data_file.load_data(path)
+    data_file.save_data(output_path, rows, columns, counts)
+    print("{} -> {} ({} rows)".format(path, output_path, len(rows)))
+    if remove:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    parser = get_parser()
+    args = parser.parse_args()
+    for path in args.paths:
+        convert(path, args.remove)
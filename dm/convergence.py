@@ -0,0 +1,128 @@
+import logging
+import numpy as np
+from .inference import (
+    get_response_idx_list,
+    getXy,
+    get_factor_once_success,
+    get_factor_counts,
+)
+from .doe.packed import CHUNK_CELLS
+
+root_logger = logging.getLogger()
+
+
+def get_deletable_mask(factor_manager) -> np.ndarray:
+    """
+    Mask of the factors which can be deleted alone (deleting them makes a
+    valid factor once revised)
+    """
+    factor_size = factor_manager.size
+    deletable = np.zeros(factor_size, dtype=bool)
+    chunk_size = max(1, CHUNK_CELLS // max(1, factor_size))
+    for start in range(0, factor_size, chunk_size):
+        stop = min(start + chunk_size, factor_size)
+        factor_list = np.zeros((stop - start, factor_size), dtype=np.int8)
+        factor_list[np.arange(stop - start), np.arange(start, stop)] = 1
+        factor_list = factor_manager.revise_factors(factor_list)
+        deletable[start:stop] = factor_manager.valid_factors(factor_list)
+    return deletable
+
+
+class ConvergenceMonitor:
+    """
+    Stop the experiments once the inferred slices converge: every interval
+    observations, the slice of every criterion is inferred by once_success
+    and simple_bayes (as model.py), and the DoE manager is stopped when none
+    of them changed over the last window observations.
+
+    The slices say nothing of the factors never deleted yet (the systematic
+    designs delete them late, in order), so the window only starts once every
+    deletable factor (deletable: mask of the factors which can be deleted
+    alone, get_deletable_mask; every factor if None) has been
+    deleted by some observation. The other factors are never deleted by the
+    strategies which only plan valid factors.
+    """
+
+    def __init__(self, num_test, num_crit, interval, window, deletable=None):
+        if interval <= 0:
+            raise Exception("Invalid interval({})".format(interval))
+        if window <= 0:
+            raise Exception("Invalid window({})".format(window))
+        self._num_test = num_test
+        self._num_crit = num_crit
+        self._interval = interval
+        self._window = window
+        self._deletable = None if deletable is None else np.asarray(deletable, dtype=bool)
+        self._slices = None
+        # Observation counts of the last check and of the last change of the slices
+        self._checked_cnt = 0
+        self._changed_cnt = 0
+        self.converged = False
+
+    def update(self, doe_manager) -> bool:
+        """
+        Check the slices every interval observations, and stop the DoE
+        manager if they converged
+        :return: whether the slices converged
+        """
+        observed_cnt = doe_manager.observed_cnt
+        if self.converged or observed_cnt < self._checked_cnt + self._interval:
+            return self.converged
+        self._checked_cnt = observed_cnt
+        factors, responses = doe_manager.get_observations()
+        slices = self.get_slices(factors, responses)
+        untested = ~np.any(factors, axis=0)
+        if self._deletable is not None:
+            untested &= self._deletable
+        untested_cnt = int(np.sum(untested))
+        if untested_cnt:
+            self._slices = slices
+            self._changed_cnt = observed_cnt
+            root_logger.info(
+                "Convergence: {} deletable factors never deleted at {} observations".format(
+                    untested_cnt, observed_cnt
+                )
+            )
+        elif self._slices is None or not np.array_equal(slices, self._slices):
+            self._slices = slices
+            self._changed_cnt = observed_cnt
+            root_logger.info("Convergence: slices changed at {} observations".format(observed_cnt))
+        elif observed_cnt - self._changed_cnt >= self._window:
+            root_logger.info(
+                "Convergence: slices unchanged from {} to {} observations, stop".format(
+                    self._changed_cnt, observed_cnt
+                )
+            )
+            self.converged = True
+            doe_manager.stop()
+        return self.converged
+
+    def get_slices(self, factors, responses) -> np.ndarray:
+        """
+        Deletable factors inferred by once_success and simple_bayes for every
+        criterion (3-D array: criterion, estimator, factor)
+        """
+        factor_size = factors.shape[1]
+        data = np.hstack((factors, responses)).astype(bool)
+        slices = np.zeros((self._num_crit, 2, factor_size), dtype=bool)
+        for crit_idx in range(self._num_crit):
+            idx_list = factor_size + get_response_idx_list(self._num_test, self._num_crit, crit_idx)
+            slices[crit_idx, 0] = get_factor_once_success(data, factor_size, idx_list)
+            slices[crit_idx, 1] = self.get_bayes_slice(*getXy(data, factor_size, idx_list))
+        return slices
+
+    @staticmethod
+    def get_bayes_slice(X, y) -> np.ndarray:
+        """
+        simple_bayes (get_factor_individual_bayesian) over the factors deleted
+        at least once: p(Response=1|Factor=1) is undefined (nan) for the other
+        ones, which would make the mean nan and the slice empty whatever the
+        observations
+        """
+        count_factor_1_response_1, count_factor_1 = get_factor_counts(X, y)
+        tested = count_factor_1 > 0
+        bayes_slice = np.zeros(len(tested), dtype=bool)
+        if tested.any():
+            factor_prop = count_factor_1_response_1[tested] / count_factor_1[tested]
+            bayes_slice[tested] = factor_prop > np.mean(factor_prop)
+        return bayes_slice
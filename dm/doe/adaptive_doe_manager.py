@@ -0,0 +1,119 @@
+import logging
+import numpy as np
+from .doe_manager import DoEManager
+from .packed import PackedBitMatrix
+from ..inference import get_response_idx_list, get_factor_posterior
+
+root_logger = logging.getLogger()
+
+# Rounds of sampling to fill a batch, as the factors planned already are dropped
+MAX_SAMPLING_ROUNDS = 10
+
+
+class AdaptiveDoEManager(DoEManager):
+    """
+    Plan the factors batch by batch: once every planned factor is observed,
+    the per-factor Bayesian rates p(Response=1|Factor=1) of every criterion
+    are refitted (Beta posterior, as simple_bayes of model.py), and every
+    factor of the next batch deletes a factor picked by the deviation of its
+    rates (the highest of the criteria), with random partners.
+
+    The number of deleted factors follows the probability threshold, as in
+    the random strategy. Every batch draws from its own generator, seeded by
+    the seed and the number of observations, so that a resumed run plans the
+    same batches.
+    """
+
+    adaptive = True
+
+    def __init__(
+        self,
+        factor_manager,
+        response_manager,
+        max_expr,
+        threshold,
+        batch_size,
+        seed=None,
+        plan_path=None,
+        expr_idx_range=None,
+    ):
+        if batch_size <= 0:
+            raise Exception("Invalid batch_size({})".format(batch_size))
+        self._threshold = threshold
+        self._batch_size = batch_size
+        self._factor_manager = factor_manager
+        self._num_test = response_manager.num_test
+        self._num_crit = response_manager.num_crit
+        self._append_cnt = 0
+        if seed:
+            print("Numpy random seed: {}".format(seed))
+            root_logger.debug("Numpy random seed: {}".format(seed))
+            self._seed = int(seed)
+        else:
+            self._seed = 0
+        super().__init__(factor_manager, response_manager, max_expr, plan_path, expr_idx_range)
+
+    def _init_factor_queue(self, plan_path=None, expr_idx_range=None):
+        if plan_path is not None and expr_idx_range is not None:
+            super()._init_factor_queue(plan_path, expr_idx_range)
+        else:
+            self.add_factor([0] * self._factor_size)
+            self._plan_batch(np.ones(self._factor_size))
+
+    def append(self, factor, response):
+        super().append(factor, response)
+        self._append_cnt += 1
+        if not self._replan or len(self._plan.exhaust()) >= self._max_expr:
+            return
+        if self._append_cnt == len(self._plan):
+            self._plan_next_batch()
+
+    def _plan_next_batch(self):
+        """
+        Refit the rates of every criterion on the observations, and plan the next batch
+        """
+        factors = self._observed_factors.unpack()
+        responses = self._observed_responses.unpack()
+        deviation = np.zeros(self._factor_size)
+        for crit_idx in range(self._num_crit):
+            response_idx_list = get_response_idx_list(self._num_test, self._num_crit, crit_idx)
+            y = np.bitwise_and.reduce(responses[:, response_idx_list], 1)
+            _, variance = get_factor_posterior(factors, y)
+            deviation = np.maximum(deviation, np.sqrt(variance))
+        root_logger.info(
+            "Adaptive: {} observations, rate deviation mean {:.3f}, max {:.3f}".format(
+                len(factors), np.mean(deviation), np.max(deviation)
+            )
+        )
+        self._plan_batch(deviation)
+
+    def _plan_batch(self, weights):
+        """
+        Plan a batch of factors, each one deleting a factor picked by the
+        weights and uniformly random partners
+        """
+        rng = np.random.default_rng((self._seed, self._append_cnt))
+        planned_cnt = 0
+        for _ in range(MAX_SAMPLING_ROUNDS):
+            need = min(self._batch_size - planned_cnt, self._max_expr - len(self._plan.exhaust()))
+            if need <= 0:
+                break
+            factors = np.zeros((need, self._factor_size), dtype=bool)
+            targets = rng.choice(self._factor_size, need, p=weights / weights.sum())
+            partner_cnts = np.maximum(rng.binomial(self._factor_size, self._threshold, need) - 1, 0)
+            for row, (target, partner_cnt) in enumerate(zip(targets, partner_cnts)):
+                partners = rng.choice(self._factor_size - 1, partner_cnt, False)
+                partners[partners >= target] += 1
+                factors[row, partners] = True
+                factors[row, target] = True
+            factors = self._revise_factors(factors)
+            factors = factors[self._factor_manager.valid_factors(factors)]
+            packed = PackedBitMatrix.pack(factors)
+            new_cnt = np.cumsum(self._plan.new_rows(packed))
+            if len(new_cnt) and new_cnt[-1]:
+                self._plan.extend([packed[: np.searchsorted(new_cnt, need) + 1]])
+                planned_cnt += min(new_cnt[-1], need)
+        if planned_cnt:
+            root_logger.info("Adaptive: batch of {} factors planned".format(planned_cnt))
+        else:
+            root_logger.info("Adaptive: no new factor, end of the plan")
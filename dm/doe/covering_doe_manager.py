@@ -0,0 +1,461 @@
+import math
+import logging
+import itertools
+import numpy as np
+from .doe_manager import DoEManager
+from .packed import CHUNK_CELLS
+
+root_logger = logging.getLogger()
+
+
+def get_full_factorial(factor_size) -> np.ndarray:
+    rows = np.arange(1 << factor_size)[:, None]
+    return ((rows >> np.arange(factor_size)[::-1]) & 1).astype(np.int8)
+
+
+def get_covering_array(factor_size, strength) -> np.ndarray:
+    """
+    Binary covering array: every strength factors take every combination of
+    values in some row
+    :return: 2-D array of 0/1 (int8)
+    """
+    if strength == 2:
+        return get_pairwise_covering_array(factor_size)
+    elif strength == 3:
+        return get_triplewise_covering_array(factor_size)
+    else:
+        raise Exception("Invalid strength({})".format(strength))
+
+
+def get_pairwise_covering_array(factor_size) -> np.ndarray:
+    """
+    Optimal binary covering array of strength 2 (Kleitman and Spencer): with
+    the smallest N such that C(N - 1, ceil(N / 2)) >= factor_size, a row of 0
+    over N - 1 rows whose columns are distinct sets of ceil(N / 2) rows.
+    Two distinct columns of the same weight differ both ways, and intersect
+    since 2 * ceil(N / 2) > N - 1.
+    """
+    if factor_size <= 2:
+        return get_full_factorial(factor_size)
+    row_cnt = 4
+    while math.comb(row_cnt - 1, (row_cnt + 1) // 2) < factor_size:
+        row_cnt += 1
+    array = np.zeros((row_cnt, factor_size), dtype=np.int8)
+    rows = itertools.combinations(range(1, row_cnt), (row_cnt + 1) // 2)
+    for column, column_rows in enumerate(itertools.islice(rows, factor_size)):
+        array[list(column_rows), column] = 1
+    return array
+
+
+def get_triplewise_covering_array(factor_size) -> np.ndarray:
+    """
+    Binary covering array of strength 3, doubled recursively (Roux): with A of
+    strength 3 and B of strength 2 over half of the factors,
+        A  A
+        B ~B
+    has strength 3 over twice the factors. The triples within a half are
+    covered by A; a triple with a factor and its copy takes the equal values
+    in A and the different ones in B (whose pairs cover the two others), and
+    the other triples are triples of A.
+    About 120 rows for 5000 factors, built in milliseconds.
+    """
+    if factor_size <= 3:
+        return get_full_factorial(factor_size)
+    half = (factor_size + 1) // 2
+    array = get_triplewise_covering_array(half)
+    pairwise = get_pairwise_covering_array(half)
+    return np.vstack((np.hstack((array, array)), np.hstack((pairwise, 1 - pairwise))))[
+        :, :factor_size
+    ]
+
+
+def get_uncovered_pairs(bits, first_cnt) -> (np.ndarray, np.ndarray):
+    """
+    Pairs of columns (the first one among the first first_cnt columns, before
+    the second one) and values which no row covers. The rows covering the
+    four value combinations are counted from the rows deleting both columns,
+    with a single matrix product.
+    :param bits: 2-D array of 0/1 (float32)
+    :return: columns and values (2-D arrays, 2 columns) of the pairs
+    """
+    row_cnt = len(bits)
+    both = bits[:, :first_cnt].T @ bits
+    lhs_cnt = bits[:, :first_cnt].sum(axis=0)
+    rhs_cnt = bits.sum(axis=0)
+    # (0, 1) and (0, 0) are uncovered if both == rhs_cnt and both == rhs_cnt + lhs_cnt - row_cnt
+    rhs_only = both - rhs_cnt[None, :]
+    uncovered = both == 0
+    uncovered |= both == lhs_cnt[:, None]
+    uncovered |= rhs_only == 0
+    uncovered |= rhs_only == (lhs_cnt - row_cnt)[:, None]
+    lhs, rhs = np.nonzero(uncovered)
+    lhs, rhs = lhs[lhs < rhs], rhs[lhs < rhs]
+    both = both[lhs, rhs]
+    counts = [
+        row_cnt - lhs_cnt[lhs] - rhs_cnt[rhs] + both,
+        rhs_cnt[rhs] - both,
+        lhs_cnt[lhs] - both,
+        both,
+    ]
+    pair_columns, pair_values = [], []
+    for combo, count in enumerate(counts):
+        found = count == 0
+        pair_columns.append(np.column_stack((lhs[found], rhs[found])))
+        pair_values.append(np.tile([combo >> 1, combo & 1], (np.count_nonzero(found), 1)))
+    return np.vstack(pair_columns), np.vstack(pair_values) > 0
+
+
+def iter_uncovered_tuples(rows, strength, first_columns=None):
+    """
+    Tuples of columns and values which no row covers, in batches (at once for
+    strength 2, by first column for strength 3), so that they are never
+    enumerated all at once
+    :param rows: 2-D array of bits
+    :param first_columns: only the tuples with one of these columns (every column if None)
+    :return: generator of columns and values (2-D arrays, strength columns) of the tuples
+    """
+    factor_size = np.shape(rows)[1]
+    if first_columns is None:
+        first_columns = np.arange(factor_size)
+    # The first columns come first, so that a tuple with one of them starts with one
+    mask = np.zeros(factor_size, dtype=bool)
+    mask[first_columns] = True
+    order = np.concatenate((np.nonzero(mask)[0], np.nonzero(~mask)[0]))
+    first_cnt = int(mask.sum())
+    bits = np.asarray(rows, dtype=np.float32)[:, order]
+    if strength == 2:
+        pair_columns, pair_values = get_uncovered_pairs(bits, first_cnt)
+        if len(pair_columns):
+            yield order[pair_columns], pair_values
+    elif strength == 3:
+        for first in range(min(first_cnt, factor_size - 2)):
+            tuple_columns, tuple_values = [], []
+            for a in range(2):
+                selected = bits[bits[:, first] == a, first + 1 :]
+                pair_columns, pair_values = get_uncovered_pairs(selected, selected.shape[1])
+                tuple_columns.append(
+                    np.column_stack((np.full(len(pair_columns), first), pair_columns + first + 1))
+                )
+                tuple_values.append(
+                    np.column_stack((np.full(len(pair_columns), a > 0), pair_values))
+                )
+            tuple_columns = np.vstack(tuple_columns)
+            if len(tuple_columns):
+                yield order[tuple_columns], np.vstack(tuple_values)
+    else:
+        raise Exception("Invalid strength({})".format(strength))
+
+
+def get_uncovered_tuples(rows, strength) -> (np.ndarray, np.ndarray):
+    """
+    Tuples of columns and values which no row covers
+    :param rows: 2-D array of bits
+    :return: columns and values (2-D arrays, strength columns) of the tuples
+    """
+    tuple_columns = [np.zeros((0, strength), dtype=np.int64)]
+    tuple_values = [np.zeros((0, strength), dtype=bool)]
+    for columns, values in iter_uncovered_tuples(rows, strength):
+        tuple_columns.append(columns)
+        tuple_values.append(values)
+    return np.vstack(tuple_columns).astype(np.int64), np.vstack(tuple_values).astype(bool)
+
+
+class RepairRows:
+    """
+    Rows (deleted factors) added to cover tuples, with the factors kept by the
+    tuples they cover. The rows changed by a batch of tuples are saved, to be
+    restored if their revision breaks a tuple.
+    """
+
+    def __init__(self, factor_size):
+        self._deleted = np.zeros((16, factor_size), dtype=bool)
+        self._kept = np.zeros((16, factor_size), dtype=bool)
+        self._size = 0
+        self._batch_start = 0
+        self._saved = {}
+
+    def begin(self):
+        self._batch_start = self._size
+        self._saved = {}
+
+    def add(self, columns, values, deleted_columns, kept_columns):
+        """
+        Cover the tuple by the first row covering it, or else by the first row
+        it fits in, or else by a new row
+        """
+        deleted = self._deleted[: self._size]
+        kept = self._kept[: self._size]
+        covering = (deleted[:, columns] == values).all(axis=1)
+        if covering.any():
+            row = int(np.argmax(covering))
+            self._save(row)
+        else:
+            fits = ~deleted[:, kept_columns].any(axis=1) & ~kept[:, deleted_columns].any(axis=1)
+            row = int(np.argmax(fits)) if fits.any() else self._grow(1).start
+            self._save(row)
+            self._deleted[row, deleted_columns] = True
+        self._kept[row, kept_columns] = True
+
+    def commit(self, revise_factors, valid_factors):
+        """
+        Revise the rows changed by the batch, and restore the ones which become
+        invalid or delete a kept factor
+        """
+        rows = np.array(sorted(self._saved) + list(range(self._batch_start, self._size)))
+        if not len(rows):
+            return
+        revised = np.asarray(revise_factors(self._deleted[rows]), dtype=bool)
+        broken = ~valid_factors(revised) | (revised & self._kept[rows]).any(axis=1)
+        self._deleted[rows[~broken]] = revised[~broken]
+        for row in rows[broken]:
+            self._deleted[row], self._kept[row] = self._saved.get(row, (False, False))
+        self.begin()
+
+    def covers(self, columns, values) -> np.ndarray:
+        """
+        Mask of the tuples covered by some row
+        """
+        return self.get_covering_rows(columns, values) >= 0
+
+    def get_covering_rows(self, columns, values) -> np.ndarray:
+        """
+        First row covering every tuple (-1 if none)
+        """
+        deleted = self._deleted[: self._size]
+        covering_rows = np.full(len(columns), -1, dtype=np.int64)
+        if not self._size:
+            return covering_rows
+        chunk_size = max(1, CHUNK_CELLS // (self._size * columns.shape[1]))
+        for start in range(0, len(columns), chunk_size):
+            stop = start + chunk_size
+            covering = (deleted[:, columns[start:stop]] == values[start:stop]).all(axis=2)
+            covering_rows[start:stop] = np.where(
+                covering.any(axis=0), np.argmax(covering, axis=0), -1
+            )
+        return covering_rows
+
+    def keep(self, rows, columns, values):
+        """
+        Keep the kept factors of the tuples in the rows covering them
+        """
+        for row in np.unique(rows):
+            self._save(row)
+        kept = ~values
+        self._kept[np.broadcast_to(rows[:, None], columns.shape)[kept], columns[kept]] = True
+
+    def append(self, deleted, kept):
+        rows = self._grow(len(deleted))
+        self._deleted[rows] = deleted
+        self._kept[rows] = kept
+
+    def rows(self) -> np.ndarray:
+        deleted = self._deleted[: self._size]
+        return deleted[deleted.any(axis=1)]
+
+    def _save(self, row):
+        if row < self._batch_start and row not in self._saved:
+            self._saved[row] = (self._deleted[row].copy(), self._kept[row].copy())
+
+    def _grow(self, size) -> range:
+        start = self._size
+        if start + size > len(self._deleted):
+            capacity = max(2 * len(self._deleted), start + size)
+            for name in ["_deleted", "_kept"]:
+                grown = np.zeros((capacity, self._deleted.shape[1]), dtype=bool)
+                grown[:start] = getattr(self, name)[:start]
+                setattr(self, name, grown)
+        self._size += size
+        return range(start, self._size)
+
+
+class CoveringDoEManager(DoEManager):
+    """
+    t-way covering array (t = strength): every strength factors are deleted
+    and kept in every combination by some run.
+    The array covers the factors which can be deleted alone, and the runs are
+    revised and checked; then the tuples which the revision left uncovered are
+    covered again by additional runs, as far as the revision allows them.
+    The construction is deterministic, so no seed is taken.
+    """
+
+    def __init__(
+        self,
+        factor_manager,
+        response_manager,
+        max_expr,
+        strength=2,
+        plan_path=None,
+        expr_idx_range=None,
+    ):
+        self._strength = strength
+        self._factor_manager = factor_manager
+        super().__init__(factor_manager, response_manager, max_expr, plan_path, expr_idx_range)
+
+    def _init_factor_queue(self, plan_path=None, expr_idx_range=None):
+        if plan_path is not None and expr_idx_range is not None:
+            super()._init_factor_queue(plan_path, expr_idx_range)
+        else:
+            self.add_factor([0] * self._factor_size)
+            self.add_factor_chunks(self._generate_factor_chunks())
+
+    def get_deletable_factors(self) -> np.ndarray:
+        """
+        Factors which can be deleted alone (deleting them makes a valid factor once revised)
+        """
+        return self._get_deleted_alone()[0]
+
+    def _get_deleted_alone(self) -> (np.ndarray, np.ndarray):
+        """
+        Factors which can be deleted alone, and the factors deleted along with
+        each of them once revised (packed bits, one row per deletable factor)
+        """
+        deletable, deleted_alone = [], []
+        chunk_size = max(1, CHUNK_CELLS // self._factor_size)
+        for start in range(0, self._factor_size, chunk_size):
+            stop = min(start + chunk_size, self._factor_size)
+            factor_list = np.zeros((stop - start, self._factor_size), dtype=np.int8)
+            factor_list[np.arange(stop - start), np.arange(start, stop)] = 1
+            factor_list = self._revise_factors(factor_list)
+            valid = self._factor_manager.valid_factors(factor_list)
+            deletable.append(start + np.nonzero(valid)[0])
+            deleted_alone.append(np.packbits(np.asarray(factor_list[valid], dtype=bool), axis=1))
+        return np.concatenate(deletable), np.vstack(deleted_alone)
+
+    def _generate_factor_chunks(self):
+        deletable, deleted_alone = self._get_deleted_alone()
+        if not len(deletable):
+            root_logger.info("Covering array: no deletable factor")
+            return
+        array = get_covering_array(len(deletable), self._strength)
+        factor_list = np.zeros((len(array), self._factor_size), dtype=np.int8)
+        factor_list[:, deletable] = array
+        revised = self._revise_factors(factor_list)
+        valid = self._factor_manager.valid_factors(revised)
+        revised = revised[valid]
+        if not valid.all():
+            # The tuples of any factor may have lost their runs
+            changed = None
+        else:
+            changed = np.nonzero((revised[:, deletable] != array).any(axis=0))[0]
+        if changed is None or len(changed):
+            kept_rows = self._get_kept_rows(factor_list, deletable, deleted_alone)
+            revised = np.vstack((revised, kept_rows))
+            repair_rows = self._get_repair_rows(revised, deletable, deleted_alone, changed)
+            revised = np.vstack((revised, repair_rows))
+        root_logger.info(
+            "Covering array: {} runs (strength {}, {} deletable factors)".format(
+                len(revised), self._strength, len(deletable)
+            )
+        )
+        yield revised
+
+    def _get_kept_rows(self, factor_list, deletable, deleted_alone) -> np.ndarray:
+        """
+        Rows of the array keeping their kept factors: the deleted factors whose
+        revision deletes a kept factor of the row are kept too. They cover again
+        most of the tuples which lost their runs to the revision.
+        """
+        kept = ~factor_list.astype(bool)
+        conflict = np.zeros_like(kept)
+        chunk_size = max(1, CHUNK_CELLS // self._factor_size)
+        for start in range(0, len(deletable), chunk_size):
+            alone = np.unpackbits(
+                deleted_alone[start : start + chunk_size], axis=1, count=self._factor_size
+            )
+            conflict[:, deletable[start : start + chunk_size]] = (
+                kept.astype(np.float32) @ alone.T.astype(np.float32) > 0
+            )
+        kept_rows = ~kept & ~conflict
+        kept_rows = kept_rows[kept_rows.any(axis=1)]
+        revised = np.asarray(self._revise_factors(kept_rows), dtype=bool)
+        keeps = self._factor_manager.valid_factors(revised) & ~(revised & ~kept_rows).any(axis=1)
+        return revised[keeps].astype(np.int8)
+
+    def _get_repair_rows(self, rows, deletable, deleted_alone, changed) -> np.ndarray:
+        """
+        Rows covering the tuples of the deletable factors uncovered by the rows.
+        A tuple covered by a row of the array stays covered unless the revision
+        changed one of its factors in that row, so only the tuples of the
+        changed factors (of every factor if None) are enumerated, lazily.
+        The tuples are repaired in batches: the tuples deleting a factor whose
+        revision deletes one of their kept factors are infeasible, the others
+        are revised alone at once to check them, and the feasible ones are
+        packed greedily (a tuple goes to the first row which covers it, or else
+        to the first row which deletes none of its kept factors and keeps none
+        of the factors it deletes). The packed rows are revised at once, the
+        rows which the revision breaks are restored, and the tuples left
+        uncovered get their own rows.
+        """
+        repair = RepairRows(self._factor_size)
+        infeasible_cnt, tuple_cnt = 0, 0
+        batch_size = max(1, CHUNK_CELLS // self._factor_size)
+        for tuple_columns, tuple_values in iter_uncovered_tuples(
+            rows[:, deletable], self._strength, changed
+        ):
+            for start in range(0, len(tuple_columns), batch_size):
+                tuple_cnt += len(tuple_columns[start : start + batch_size])
+                infeasible_cnt += self._repair_batch(
+                    repair,
+                    deletable,
+                    deleted_alone,
+                    tuple_columns[start : start + batch_size],
+                    tuple_values[start : start + batch_size],
+                )
+        repair_rows = repair.rows()
+        root_logger.info(
+            "Covering array: {} tuples uncovered by the revised runs, {} runs added, "
+            "{} infeasible".format(tuple_cnt, len(repair_rows), infeasible_cnt)
+        )
+        return repair_rows.astype(np.int8)
+
+    def _repair_batch(self, repair, deletable, deleted_alone, tuple_columns, values) -> int:
+        """
+        Cover the tuples of the batch (columns among the deletable factors) by the repair rows
+        :return: number of the infeasible tuples
+        """
+        columns = deletable[tuple_columns]
+        # The tuples covered by the rows added for the former ones
+        covering_rows = repair.get_covering_rows(columns, values)
+        covered = covering_rows >= 0
+        repair.keep(covering_rows[covered], columns[covered], values[covered])
+        feasible = ~covered
+        # A deleted factor whose revision deletes a kept factor of the tuple
+        for deleted_idx, kept_idx in itertools.permutations(range(columns.shape[1]), 2):
+            kept_column = columns[:, kept_idx]
+            deletes = deleted_alone[tuple_columns[:, deleted_idx], kept_column >> 3]
+            deletes = (deletes >> (7 - (kept_column & 7))) & 1 > 0
+            feasible &= ~(values[:, deleted_idx] & ~values[:, kept_idx] & deletes)
+        infeasible_cnt = int(np.count_nonzero(~feasible & ~covered))
+        columns, values = columns[feasible], values[feasible]
+
+        # Every tuple revised alone
+        tuple_idx = np.repeat(np.arange(len(columns)), columns.shape[1])
+        alone = np.zeros((len(columns), self._factor_size), dtype=bool)
+        alone[tuple_idx[values.ravel()], columns[values]] = True
+        alone = np.asarray(self._revise_factors(alone), dtype=bool)
+        kept = np.zeros_like(alone)
+        kept[tuple_idx[~values.ravel()], columns[~values]] = True
+        feasible = self._factor_manager.valid_factors(alone) & ~(alone & kept).any(axis=1)
+        infeasible_cnt += int(np.count_nonzero(~feasible))
+        columns, values, alone, kept = (
+            columns[feasible],
+            values[feasible],
+            alone[feasible],
+            kept[feasible],
+        )
+        deleted_tuple, deleted_column = np.nonzero(alone)
+        bounds = np.searchsorted(deleted_tuple, np.arange(len(alone) + 1))
+
+        for idx in range(len(columns)):
+            repair.add(
+                columns[idx],
+                values[idx],
+                deleted_column[bounds[idx] : bounds[idx + 1]],
+                columns[idx][~values[idx]],
+            )
+        # The packed rows are revised at once; the rows the revision breaks are restored
+        repair.commit(self._revise_factors, self._factor_manager.valid_factors)
+        uncovered = ~repair.covers(columns, values)
+        if uncovered.any():
+            repair.append(alone[uncovered], kept[uncovered])
+        return infeasible_cnt
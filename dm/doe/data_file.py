@@ -0,0 +1,167 @@
+import re
+import json
+import struct
+import numpy as np
+from .packed import PackedBitMatrix, CHUNK_CELLS
+
+# Binary format: BITS_MAGIC, the length of the JSON header (uint32, little
+# endian), the JSON header padded to BITS_ALIGN bytes, the packed rows
+# (np.packbits, row by row) padded to BITS_ALIGN bytes, and the counts of the
+# rows (int64, little endian) if any.
+BITS_MAGIC = b"MOADBITS"
+BITS_VERSION = 1
+BITS_ALIGN = 64
+COUNT_COLUMN = "cnt"
+
+
+def get_plan_columns(factor_size) -> [str]:
+    return ["f{}".format(i) for i in range(factor_size)]
+
+
+def get_observation_columns(factor_size, num_test, num_crit) -> [str]:
+    return (
+        get_plan_columns(factor_size)
+        + ["comp"]
+        + [
+            "c{}-{}".format(test_idx, crit_idx)
+            for test_idx in range(1, num_test + 1)
+            for crit_idx in range(1, num_crit + 1)
+        ]
+    )
+
+
+def get_header(columns) -> dict:
+    """
+    Header of the binary file: the columns, the number of factors, and the
+    number of tests and criteria (None for plans)
+    """
+    criteria = [
+        tuple(map(int, match.groups()))
+        for match in map(lambda column: re.fullmatch(r"c(\d+)-(\d+)", column), columns)
+        if match
+    ]
+    return {
+        "columns": list(columns),
+        "factor_size": len(list(filter(lambda column: re.fullmatch(r"f\d+", column), columns))),
+        "num_test": max(criteria)[0] if criteria else None,
+        "num_crit": max(map(lambda x: x[1], criteria)) if criteria else None,
+    }
+
+
+def save_bits(path, packed_chunks, header, counts=None):
+    """
+    Save the packed rows, given as chunks (2-D arrays of packed rows); the
+    header holds the number of the rows and of the bytes per row
+    """
+    header = dict(header, version=BITS_VERSION, counts=counts is not None)
+    header_bytes = json.dumps(header).encode()
+    header_bytes += b" " * (-(len(BITS_MAGIC) + 4 + len(header_bytes)) % BITS_ALIGN)
+    packed_size = 0
+    with open(path, "wb") as f:
+        f.write(BITS_MAGIC)
+        f.write(struct.pack("<I", len(header_bytes)))
+        f.write(header_bytes)
+        for packed in packed_chunks:
+            packed_bytes = np.ascontiguousarray(packed, dtype=np.uint8).tobytes()
+            packed_size += len(packed_bytes)
+            f.write(packed_bytes)
+        if packed_size != header["rows"] * header["row_bytes"]:
+            raise Exception("Invalid packed rows({} bytes)".format(packed_size))
+        if counts is not None:
+            f.write(b"\0" * (-packed_size % BITS_ALIGN))
+            f.write(np.asarray(counts, dtype="<i8").tobytes())
+
+
+def load_bits(path) -> (dict, np.ndarray, np.ndarray):
+    """
+    Load the binary file without copying
+    :return: header, packed rows and counts (None if there are none) as read-only memmaps
+    """
+    with open(path, "rb") as f:
+        if f.read(len(BITS_MAGIC)) != BITS_MAGIC:
+            raise Exception("Invalid binary data file({})".format(path))
+        (header_size,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(header_size))
+    if header["version"] != BITS_VERSION:
+        raise Exception("Invalid binary data file version({})".format(header["version"]))
+    offset = len(BITS_MAGIC) + 4 + header_size
+    rows, row_bytes = header["rows"], header["row_bytes"]
+    if rows * row_bytes == 0:
+        # Empty memmaps are not allowed
+        packed = np.zeros((rows, row_bytes), dtype=np.uint8)
+    else:
+        packed = np.memmap(path, np.uint8, "r", offset, (rows, row_bytes))
+    counts = None
+    if header["counts"]:
+        offset += rows * row_bytes + (-rows * row_bytes % BITS_ALIGN)
+        counts = np.memmap(path, "<i8", "r", offset, (rows,)) if rows else np.zeros(0, np.int64)
+    return header, packed, counts
+
+
+class ConcatColumns:
+    """
+    Rows of the matrices (PackedBitMatrix or 2-D arrays of bits) side by side,
+    concatenated only when they are sliced
+    """
+
+    def __init__(self, *matrices):
+        self._matrices = matrices
+
+    def __len__(self):
+        return len(self._matrices[0])
+
+    def __getitem__(self, idx):
+        return np.hstack([matrix[idx] for matrix in self._matrices])
+
+
+def save_data(path, rows, columns, counts=None):
+    """
+    Save the rows of a plan (with counts) or of the observations, in CSV or
+    in the binary format (.bits), chunk by chunk
+    :param rows: 2-D array of bits, PackedBitMatrix or ConcatColumns
+    """
+    if isinstance(rows, (PackedBitMatrix, ConcatColumns)):
+        row_cnt = len(rows)
+    else:
+        rows = np.asarray(rows, dtype=np.uint8).reshape(-1, len(columns))
+        row_cnt = len(rows)
+    chunk_size = max(1, CHUNK_CELLS // max(1, len(columns)))
+    chunks = (rows[start : start + chunk_size] for start in range(0, row_cnt, chunk_size))
+    if path.endswith(".bits"):
+        if isinstance(rows, PackedBitMatrix):
+            packed_chunks = (
+                rows.packed[start : start + chunk_size] for start in range(0, row_cnt, chunk_size)
+            )
+        else:
+            packed_chunks = map(PackedBitMatrix.pack, chunks)
+        header = dict(get_header(columns), rows=row_cnt, row_bytes=(len(columns) + 7) // 8)
+        save_bits(path, packed_chunks, header, counts)
+    else:
+        if counts is not None:
+            columns = [COUNT_COLUMN] + list(columns)
+            counts = np.asarray(counts, dtype=np.int64)
+        with open(path, "w") as f:
+            f.write("# " + ",".join(columns) + "\n")
+            for start, chunk in zip(range(0, row_cnt, chunk_size), chunks):
+                if counts is not None:
+                    chunk = np.hstack((counts[start : start + chunk_size, None], chunk))
+                np.savetxt(f, chunk, delimiter=",", fmt="%d")
+
+
+def load_data(path):
+    """
+    Load the file of save_data
+    :return: columns, counts (None if there are none) and rows: a 2-D array
+    of bits (CSV), or a PackedBitMatrix over the memory-mapped file (.bits),
+    which unpacks the rows on indexing
+    """
+    if path.endswith(".bits"):
+        header, packed, counts = load_bits(path)
+        columns = header["columns"]
+        return columns, counts, PackedBitMatrix.from_packed(packed, len(columns))
+    with open(path) as f:
+        columns = f.readline().lstrip("# ").rstrip().split(",")
+    data = np.loadtxt(path, np.int64, delimiter=",", skiprows=1, ndmin=2).reshape(-1, len(columns))
+    if columns[0] == COUNT_COLUMN:
+        return columns[1:], data[:, 0], data[:, 1:].astype(np.uint8)
+    return columns, None, data.astype(np.uint8)
@@ -0,0 +1,139 @@
+import logging
+import numpy as np
+from .doe_manager import DoEManager
+from .packed import PackedBitMatrix
+
+root_logger = logging.getLogger()
+
+
+class DDMinDoEManager(DoEManager):
+    """
+    Adaptive group testing, as delta debugging: every factor deletes a chunk
+    of consecutive factors, starting from the two halves of the factor space,
+    and a chunk whose deletion changes the response (any test of any
+    criterion, or the compilation) is split in two halves planned next.
+    A chunk whose deletion keeps the response is deletable as a whole, and is
+    not split further, so that the number of runs grows with the factors
+    which matter and logarithmically with the others.
+
+    The chunks are planned as their responses are appended, in the planned
+    order, so that a resumed run plans the same factors. A chunk is the range
+    (start, stop) of its factors; subclasses may split the factors otherwise.
+    The strategy is deterministic: seed is unused, and only kept for the
+    signature shared with the other DoE managers.
+    """
+
+    adaptive = True
+
+    def __init__(
+        self,
+        factor_manager,
+        response_manager,
+        max_expr,
+        seed=None,
+        plan_path=None,
+        expr_idx_range=None,
+    ):
+        self._factor_manager = factor_manager
+        # Packed revised factor -> chunks waiting for its response
+        self._pending_chunks = {}
+        self._deletable_cnt = 0
+        super().__init__(factor_manager, response_manager, max_expr, plan_path, expr_idx_range)
+
+    def _init_factor_queue(self, plan_path=None, expr_idx_range=None):
+        if plan_path is not None and expr_idx_range is not None:
+            super()._init_factor_queue(plan_path, expr_idx_range)
+        else:
+            self.add_factor([0] * self._factor_size)
+        if self._replan:
+            # The chunks of a loaded plan are planned already
+            self._plan_chunks(self._get_root_chunks())
+
+    def append(self, factor, response):
+        super().append(factor, response)
+        if not self._replan:
+            return
+        key = PackedBitMatrix.pack([factor]).tobytes()
+        for chunk in self._pending_chunks.pop(key, []):
+            self._check_chunk(chunk, response)
+
+    def _get_root_chunks(self) -> list:
+        return self._split_chunk((0, self._factor_size)) or [(0, self._factor_size)]
+
+    def _split_chunk(self, chunk) -> list:
+        """
+        Chunks to test when the deletion of the chunk changes the response
+        (none for a single factor)
+        """
+        start, stop = chunk
+        if stop - start <= 1:
+            return []
+        middle = (start + stop) // 2
+        return [(start, middle), (middle, stop)]
+
+    def _get_chunk_factors(self, chunk):
+        """
+        Index of the factors deleted by the chunk
+        """
+        return slice(*chunk)
+
+    def _revise_chunk_factors(self, factors):
+        """
+        Revised factors of the chunks (2-D array)
+        """
+        return self._revise_factors(factors)
+
+    def _check_chunk(self, chunk, response):
+        if np.all(response):
+            self._deletable_cnt += 1
+            root_logger.debug(
+                "{}: chunk {} deletable ({} chunks deletable)".format(
+                    type(self).__name__, chunk, self._deletable_cnt
+                )
+            )
+        else:
+            self._plan_chunks(self._split_chunk(chunk))
+
+    def _plan_chunks(self, chunks):
+        """
+        Plan the factors deleting the chunks, and the ones of the chunks split
+        at once, deduplicated and cut at max_expr together: the chunks of the
+        factors cut are not waiting for a response
+        """
+        rows = []
+        self._collect_chunks(chunks, rows)
+        if not rows:
+            return
+        packed = np.vstack(rows)
+        new_rows = packed[self._plan.exhaust().new_rows(packed)]
+        plan_cnt = max(0, self._max_expr - len(self._plan))
+        for packed_row in new_rows[plan_cnt:]:
+            self._pending_chunks.pop(packed_row.tobytes(), None)
+        if plan_cnt and len(new_rows):
+            self._plan.extend([new_rows[:plan_cnt]])
+
+    def _collect_chunks(self, chunks, rows):
+        """
+        Add the packed factors deleting the chunks to rows: a chunk whose
+        revised factor is invalid (or deletes nothing) is split at once, and
+        one already observed is checked at once
+        """
+        if not chunks:
+            return
+        factors = np.zeros((len(chunks), self._factor_size), dtype=np.int8)
+        for row, chunk in enumerate(chunks):
+            factors[row, self._get_chunk_factors(chunk)] = 1
+        factors = self._revise_chunk_factors(factors)
+        valid = np.asarray(self._factor_manager.valid_factors(factors), dtype=bool)
+        valid &= np.any(factors, axis=1)
+        packed = PackedBitMatrix.pack(factors)
+        for chunk, packed_row, is_valid in zip(chunks, packed, valid):
+            if not is_valid:
+                self._collect_chunks(self._split_chunk(chunk), rows)
+                continue
+            key = packed_row.tobytes()
+            if key in self._observed_index:
+                self._check_chunk(chunk, self._observed_responses.unpack(self._observed_index[key]))
+            else:
+                self._pending_chunks.setdefault(key, []).append(chunk)
+        rows.append(packed[valid])
@@ -3,8 +3,11 @@ from .onehot_doe_manager import OneHotDoEManager
 from .random_doe_manager import RandomDoEManager
 from .one2nhot_doe_manager import One2NHotDoEManager
 from .fractional_factorial_doe_manager import FF2LDoEManager
-
-# from .packett_burman_doe_manager import PackettBurmanDoEManager
+from .plackett_burman_doe_manager import PlackettBurmanDoEManager
+from .covering_doe_manager import CoveringDoEManager
+from .adaptive_doe_manager import AdaptiveDoEManager
+from .ddmin_doe_manager import DDMinDoEManager
+from .hierarchical_doe_manager import HierarchicalDoEManager
 
 
 root_logger = logging.getLogger()
@@ -20,6 +23,9 @@ def get_doe_manager(
     seed=None,
     plan_path=None,
     expr_idx_range=None,
+    stratify=False,
+    strength=2,
+    batch_size=100,
 ):
     if doe_strategy == "onehot":
         return OneHotDoEManager(
@@ -34,7 +40,14 @@ def get_doe_manager(
             )
             threshold = 1 / factor_manager.size
         manager = RandomDoEManager(
-            factor_manager, response_manager, max_expr, threshold, seed, plan_path, expr_idx_range
+            factor_manager,
+            response_manager,
+            max_expr,
+            threshold,
+            seed,
+            plan_path,
+            expr_idx_range,
+            stratify,
         )
         return manager
     elif doe_strategy == "nhot":
@@ -48,5 +61,44 @@ def get_doe_manager(
         return FF2LDoEManager(
             factor_manager, response_manager, max_expr, seed, plan_path, expr_idx_range
         )
+    elif doe_strategy == "pb":
+        return PlackettBurmanDoEManager(
+            factor_manager, response_manager, max_expr, plan_path, expr_idx_range
+        )
+    elif doe_strategy == "covering":
+        return CoveringDoEManager(
+            factor_manager,
+            response_manager,
+            max_expr,
+            strength,
+            plan_path,
+            expr_idx_range,
+        )
+    elif doe_strategy == "adaptive":
+        if threshold == 0.0:
+            root_logger.info(
+                "Set default doe_random_threshold: 1 / ({}:factor_size) = {}".format(
+                    factor_manager.size, 1 / factor_manager.size
+                )
+            )
+            threshold = 1 / factor_manager.size
+        return AdaptiveDoEManager(
+            factor_manager,
+            response_manager,
+            max_expr,
+            threshold,
+            batch_size,
+            seed,
+            plan_path,
+            expr_idx_range,
+        )
+    elif doe_strategy == "ddmin":
+        return DDMinDoEManager(
+            factor_manager, response_manager, max_expr, seed, plan_path, expr_idx_range
+        )
+    elif doe_strategy == "hierarchical":
+        return HierarchicalDoEManager(
+            factor_manager, response_manager, max_expr, seed, plan_path, expr_idx_range
+        )
     else:
         raise Exception("Invalid factor_level: {}".format(doe_strategy))
@@ -1,7 +1,9 @@
 import os
-import queue
 import logging
 import numpy as np
+from .packed import PackedBitMatrix, CHUNK_CELLS
+from .plan_cursor import PlanCursor
+from . import data_file
 from abc import ABC, abstractmethod, ABCMeta
 
 root_logger = logging.getLogger()
@@ -10,22 +12,29 @@ root_logger = logging.getLogger()
 class DoEManager(ABC):
     __metaclass__ = ABCMeta
 
+    # Plans factors from the responses (through append), after the initial plan
+    adaptive = False
+
     @abstractmethod
     def __init__(
         self, factor_manager, response_manager, max_expr, plan_path, expr_idx_range=None,
     ):
         self._factor_size = factor_manager.size
         self._revise_factor = factor_manager.revise_factor
+        self._revise_factors = factor_manager.revise_factors
         if response_manager is None:
             self._response_size = -1
         else:
             self._response_size = response_manager.size
-        self._matrix = {}
         self._max_expr = max_expr
         self._expr_cnt = 0
-        self._factor_queue = queue.Queue()
-        self._key_counter_dict = {}
         self._expr_idx_range = expr_idx_range
+        # Plan: distinct revised factors, produced lazily and read through the cursor
+        self._plan = PlanCursor(self._factor_size)
+        # Observations: factors and responses, with the index of the packed factors
+        self._observed_factors = PackedBitMatrix(self._factor_size)
+        self._observed_responses = None
+        self._observed_index = {}
 
         # Debug
         root_logger.debug(
@@ -34,93 +43,136 @@ class DoEManager(ABC):
             )
         )
 
+        # A plan slice (planned_idx) is run as it is
+        self._replan = self.adaptive and (expr_idx_range is None or expr_idx_range == "all")
+
         self._init_factor_queue(plan_path, self._expr_idx_range)
+        if self._replan:
+            # The plan grows with the responses
+            self._expr_idx_range = None
         root_logger.info("Initial factor queue size: {}".format(self.qsize))
 
-    @staticmethod
-    def factor2key(factor):
-        return "".join(list(map(str, factor)))
-
-    @staticmethod
-    def key2factor(key):
-        return list(map(int, ",".join(key).split(",")))
-
-    @staticmethod
-    def response2numlist(response):
-        return list(map(lambda x: 1 if x else 0, response))
-
     def append(self, factor, response):
-        self._matrix[self.factor2key(factor)] = response
+        packed_factor = PackedBitMatrix.pack([factor])
+        packed_response = PackedBitMatrix.pack([response])
+        if self._observed_responses is None:
+            self._observed_responses = PackedBitMatrix(len(response))
+        key = packed_factor.tobytes()
+        if key in self._observed_index:
+            self._observed_responses.set_packed(self._observed_index[key], packed_response[0])
+        else:
+            self._observed_index[key] = self._observed_factors.append_packed(packed_factor)[0]
+            self._observed_responses.append_packed(packed_response)
 
     @abstractmethod
     def _init_factor_queue(self, plan_path, expr_idx_range):
-        plan = np.genfromtxt(plan_path, int, delimiter=",", skip_header=1)
-        assert plan.shape[1] == self._factor_size
+        columns, _, plan = data_file.load_data(plan_path)
+        assert len(columns) == self._factor_size
         if expr_idx_range == "all":
             self._expr_idx_range = expr_idx_range = range(0, len(plan))
-        for factor in plan[expr_idx_range]:
-            self.add_factor(factor)
+        chunk_size = max(1, CHUNK_CELLS // self._factor_size)
+        self.add_factor_chunks(
+            plan[start : min(start + chunk_size, expr_idx_range.stop)]
+            for start in range(expr_idx_range.start, expr_idx_range.stop, chunk_size)
+        )
 
     @property
     def qsize(self):
-        return self._factor_queue.qsize()
+        return self._plan.qsize
+
+    @property
+    def observed_cnt(self):
+        return len(self._observed_factors)
+
+    def get_observations(self) -> (np.ndarray, np.ndarray):
+        """
+        Factors and responses observed so far (2-D arrays of bits)
+        """
+        if self._observed_responses is None:
+            return self._observed_factors.unpack(), np.zeros((0, 0), dtype=np.uint8)
+        return self._observed_factors.unpack(), self._observed_responses.unpack()
+
+    @property
+    def expr_idx_range(self):
+        """
+        Range of the plan, as far as it has been produced if it is not loaded
+        """
+        if self._expr_idx_range is None:
+            return range(0, len(self._plan))
+        return self._expr_idx_range
 
     def add_factor(self, factor):
-        revised_factor = self._revise_factor(factor)
-        revised_key = self.factor2key(revised_factor)
-        if revised_key not in self._key_counter_dict.keys():
-            self._factor_queue.put(revised_factor)
-            self._key_counter_dict[revised_key] = 1
-        else:
-            self._key_counter_dict[revised_key] += 1
+        self.add_factors([factor])
+
+    def add_factors(self, factors):
+        """
+        add_factor on every row of the 2-D array of factors, revised at once
+        """
+        self.add_factor_chunks([factors])
+
+    def add_factor_chunks(self, chunks):
+        """
+        Plan the factors of the chunks (an iterable of 2-D arrays of factors, e.g.
+        a generator), revised and planned lazily as the plan is read
+        """
+        self._plan.extend(
+            PackedBitMatrix.pack(self._revise_factors(chunk)) for chunk in chunks if len(chunk)
+        )
 
     def get_next_factor(self):
-        if self._expr_cnt < self._max_expr and not self._factor_queue.empty():
-            self._expr_cnt += 1
-            return self._factor_queue.get()
-        else:
-            return None
-
-    def save_doe_plan(self, program_space):
-        plan_path = os.path.join(program_space.base_work_dir, "plan.csv")
+        if self._expr_cnt < self._max_expr:
+            factor = self._plan.next()
+            if factor is not None:
+                self._expr_cnt += 1
+                return factor.tolist()
+        return None
+
+    def stop(self):
+        """
+        Read no more factors: the plan ends at the factors read or observed
+        (replayed) so far
+        """
+        self._max_expr = max(self._expr_cnt, self.observed_cnt)
+        start = self.expr_idx_range.start
+        self._expr_idx_range = range(start, start + self._max_expr)
+
+    def save_doe_plan(self, program_space, data_format="csv"):
+        """
+        Produce the rest of the plan, and save the factors not read yet
+        """
+        self._plan.exhaust()
+        self._save_plan(program_space, data_format, self._plan.position, None)
+
+    def save_executed_plan(self, program_space, data_format="csv"):
+        """
+        Save the factors read so far, i.e. the ones planned from the responses
+        too, so that the run can be replayed with planned_idx
+        """
+        self._save_plan(program_space, data_format, 0, self._plan.position)
+
+    def _save_plan(self, program_space, data_format, start, stop):
+        plan_path = os.path.join(program_space.base_work_dir, "plan." + data_format)
         root_logger.info("Saving plan(path: {}).".format(plan_path))
-        plan = []
-        while not self._factor_queue.empty():
-            factor = self._factor_queue.get()
-            key = self.factor2key(factor)
-            plan.append([self._key_counter_dict[key]] + list(factor))
-        for factor in plan:
-            self._factor_queue.put(factor[1:])
-        np_matrix = np.array(plan)
-        np.savetxt(
+        data_file.save_data(
             plan_path,
-            np_matrix,
-            delimiter=",",
-            fmt="%d",
-            header="cnt," + ",".join(["f{}".format(i) for i in range(self._factor_size)]),
+            self._plan.rows(start, stop),
+            data_file.get_plan_columns(self._factor_size),
+            self._plan.counts(start, stop),
         )
 
-    def save_model(self, program_space):
+    def save_model(self, program_space, data_format="csv"):
         output_path = os.path.join(
             program_space.base_work_dir,
-            "expr_{}_{}.csv".format(self._expr_idx_range.start, self._expr_idx_range.stop),
+            "expr_{}_{}.{}".format(self.expr_idx_range.start, self.expr_idx_range.stop, data_format),
         )
-        matrix = []
-        for k, v in self._matrix.items():
-            matrix.append(self.key2factor(k) + self.response2numlist(v))
-        np_matrix = np.array(matrix)
-        np.savetxt(
+        if self._observed_responses is None:
+            responses = PackedBitMatrix(0)
+        else:
+            responses = self._observed_responses
+        data_file.save_data(
             output_path,
-            np_matrix,
-            delimiter=",",
-            fmt="%d",
-            header=",".join(["f{}".format(i) for i in range(self._factor_size)])
-            + ",comp,"
-            + ",".join(
-                [
-                    "c{}-{}".format(test_idx, crit_idx)
-                    for test_idx in range(1, program_space.num_test + 1)
-                    for crit_idx in range(1, program_space.num_crit + 1)
-                ]
+            data_file.ConcatColumns(self._observed_factors, responses),
+            data_file.get_observation_columns(
+                self._factor_size, program_space.num_test, program_space.num_crit
             ),
         )
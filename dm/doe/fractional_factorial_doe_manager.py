@@ -1,6 +1,7 @@
 import numpy as np
 import logging
 from .doe_manager import DoEManager
+from .packed import CHUNK_CELLS
 
 root_logger = logging.getLogger()
 
@@ -26,26 +27,40 @@ class FF2LDoEManager(DoEManager):
             super()._init_factor_queue(plan_path, expr_idx_range)
         else:
             self.add_factor([0] * self._factor_size)
-            power2 = 2
-            factor_idx = 1
-            factor_list = np.array([[True], [False]])
-            while factor_idx < self._factor_size:
-                factor_idx += 1
-                if factor_idx == power2:
-                    factor_list = np.hstack(
-                        (
-                            np.vstack((factor_list, np.logical_not(factor_list))),
-                            np.array([[True] * power2 + [False] * power2]).reshape(power2 * 2, 1),
-                        )
-                    )
-                    power2 *= 2
-                else:
-                    lhs_idx = factor_idx - int(power2 / 2) - 1
-                    rhs_idx = int(power2 / 2) - 1
-                    new_col = np.logical_xor(factor_list[:, lhs_idx], factor_list[:, rhs_idx])
-                    factor_list = np.hstack((factor_list, new_col.reshape(power2, 1)))
+            self.add_factor_chunks(self._generate_factor_chunks())
+
+    def _generate_factor_chunks(self):
+        """
+        Rows of the design, in chunks of about CHUNK_CELLS cells.
 
+        The design doubles its rows whenever the number of factors reaches a
+        power of two P (the new rows negate the previous ones, and the new
+        factor is True on the previous rows), and the other factors are the
+        xor of two previous factors. In closed form, over 2^(floor(log2 n) + 1)
+        rows r, with parity(x) = popcount(x) % 2:
+          - factor 2^k - 1 is not parity(r >> k)
+          - factor i (P < i + 1 < 2P) is factor(i - P) xor factor(P - 1)
+            xor parity(r // 2P)
+        """
+        row_cnt = 1 << self._factor_size.bit_length()
+        chunk_size = max(1, CHUNK_CELLS // self._factor_size)
+        for start in range(0, row_cnt, chunk_size):
+            rows = np.arange(start, min(start + chunk_size, row_cnt))
+            # parity[k] = parity(rows >> k)
+            parity = np.zeros((self._factor_size.bit_length() + 2, len(rows)), dtype=bool)
+            for k in range(self._factor_size.bit_length(), -1, -1):
+                parity[k] = ((rows >> k) & 1).astype(bool) ^ parity[k + 1]
+            factor_list = np.empty((len(rows), self._factor_size), dtype=bool, order="F")
+            for factor_idx in range(self._factor_size):
+                k = (factor_idx + 1).bit_length() - 1
+                if factor_idx + 1 == 1 << k:
+                    factor_list[:, factor_idx] = ~parity[k]
+                else:
+                    power2 = 1 << k
+                    factor_list[:, factor_idx] = (
+                        factor_list[:, factor_idx - power2]
+                        ^ factor_list[:, power2 - 1]
+                        ^ parity[k + 1]
+                    )
             # np.random.shuffle(factor_list)
-            for factor in factor_list:
-                self.add_factor(factor.astype(int).tolist())
-            self._expr_idx_range = range(self.qsize)
+            yield factor_list
@@ -0,0 +1,39 @@
+import logging
+from .ddmin_doe_manager import DDMinDoEManager
+
+root_logger = logging.getLogger()
+
+
+class HierarchicalDoEManager(DDMinDoEManager):
+    """
+    Coarse-to-fine deletion along the nesting of the factors (with srcML:
+    function, block, and then stmt): the outermost factors are tested first,
+    and only a factor whose deletion changes the response is descended into,
+    its children tested next. A chunk is a tuple of sibling factors, halved as
+    in ddmin, and a single factor is split into its children.
+    A chunk deletes the deletable factors of its subtrees (with srcML, all but
+    the decl, init and return stmt nodes and the ones containing them), so
+    that the functions and blocks are tested even though they contain some.
+    With the line factor level, every line is outermost, as in ddmin.
+    """
+
+    def _get_root_chunks(self) -> list:
+        return self._halve(self._factor_manager.get_child_factors())
+
+    def _split_chunk(self, chunk) -> list:
+        if len(chunk) > 1:
+            return self._halve(chunk)
+        return self._halve(self._factor_manager.get_child_factors(chunk[0]))
+
+    def _get_chunk_factors(self, chunk):
+        return list(chunk)
+
+    def _revise_chunk_factors(self, factors):
+        return self._factor_manager.deletable_factors(factors)
+
+    @staticmethod
+    def _halve(factors) -> list:
+        if len(factors) <= 1:
+            return [tuple(factors)] if len(factors) else []
+        middle = len(factors) // 2
+        return [tuple(factors[:middle]), tuple(factors[middle:])]
@@ -2,6 +2,7 @@ import logging
 import itertools
 import numpy as np
 from .doe_manager import DoEManager
+from .packed import CHUNK_CELLS
 
 root_logger = logging.getLogger()
 
@@ -30,18 +31,20 @@ class One2NHotDoEManager(DoEManager):
             super()._init_factor_queue(plan_path, expr_idx_range)
         else:
             self.add_factor([0] * self._factor_size)
-            for i in range(self._max_n):
-                empty_pos_list = itertools.combinations(range(self._factor_size), i + 1)
-                factor_list = list(
-                    map(
-                        lambda empty_pos: list(
-                            map(lambda pos: 1 if pos in empty_pos else 0, range(self._factor_size))
-                        ),
-                        empty_pos_list,
-                    )
-                )
+            self.add_factor_chunks(self._generate_factor_chunks())
+
+    def _generate_factor_chunks(self):
+        """
+        Valid factors deleting 1 to max_n factors, in chunks of about CHUNK_CELLS cells
+        """
+        chunk_size = max(1, CHUNK_CELLS // self._factor_size)
+        for i in range(self._max_n):
+            empty_pos_iter = itertools.combinations(range(self._factor_size), i + 1)
+            while True:
+                empty_pos_list = np.array(list(itertools.islice(empty_pos_iter, chunk_size)))
+                if not len(empty_pos_list):
+                    break
+                factor_list = np.zeros((len(empty_pos_list), self._factor_size), dtype=np.int8)
+                factor_list[np.arange(len(empty_pos_list))[:, None], empty_pos_list] = 1
                 # np.random.shuffle(factor_list)
-                for factor in factor_list:
-                    if self._factor_manager.is_valid_factor(factor):
-                        self.add_factor(factor)
-                self._expr_idx_range = range(self.qsize)
+                yield factor_list[self._factor_manager.valid_factors(factor_list)]
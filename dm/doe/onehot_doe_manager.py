@@ -1,6 +1,7 @@
 import logging
 import numpy as np
 from .doe_manager import DoEManager
+from .packed import CHUNK_CELLS
 
 root_logger = logging.getLogger()
 
@@ -27,15 +28,12 @@ class OneHotDoEManager(DoEManager):
         else:
             self.add_factor([0] * self._factor_size)
             # empty_pos_list = np.random.permutation(self._factor_size)
-            empty_pos_list = list(range(self._factor_size))
-            factor_list = list(
-                map(
-                    lambda empty_pos: list(
-                        map(lambda pos: 1 if pos == empty_pos else 0, range(self._factor_size))
-                    ),
-                    empty_pos_list,
-                )
-            )
-            for factor in factor_list:
-                self.add_factor(factor)
-            self._expr_idx_range = range(self.qsize)
+            self.add_factor_chunks(self._generate_factor_chunks())
+
+    def _generate_factor_chunks(self):
+        chunk_size = max(1, CHUNK_CELLS // self._factor_size)
+        for start in range(0, self._factor_size, chunk_size):
+            stop = min(start + chunk_size, self._factor_size)
+            factor_list = np.zeros((stop - start, self._factor_size), dtype=np.int8)
+            factor_list[np.arange(stop - start), np.arange(start, stop)] = 1
+            yield factor_list
@@ -0,0 +1,81 @@
+import numpy as np
+
+# Rows are unpacked, revised, checked or written in chunks of about CHUNK_CELLS bits
+CHUNK_CELLS = 1 << 24
+
+
+class PackedBitMatrix:
+    """
+    Growable matrix of bits, stored row by row with np.packbits
+    (width bits in (width + 7) // 8 bytes per row).
+    The packed bytes of a row can be used as its hash key.
+    """
+
+    def __init__(self, width, capacity=1024):
+        self._width = width
+        self._data = np.zeros((capacity, (width + 7) // 8), dtype=np.uint8)
+        self._size = 0
+
+    @classmethod
+    def from_packed(cls, packed, width):
+        """
+        Matrix over the packed rows (e.g. a memmap), without copying
+        """
+        matrix = cls.__new__(cls)
+        matrix._width = width
+        matrix._data = packed
+        matrix._size = len(packed)
+        return matrix
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, idx):
+        return self.unpack(idx)
+
+    @property
+    def width(self):
+        return self._width
+
+    @property
+    def packed(self) -> np.ndarray:
+        """
+        Packed rows (view)
+        """
+        return self._data[: self._size]
+
+    @staticmethod
+    def pack(rows) -> np.ndarray:
+        """
+        Pack the rows (2-D array of bits)
+        """
+        return np.packbits(np.asarray(rows, dtype=bool), axis=1)
+
+    def append(self, rows) -> range:
+        """
+        Append the rows (2-D array of bits), and return their indices
+        """
+        return self.append_packed(self.pack(rows))
+
+    def append_packed(self, packed_rows) -> range:
+        start = self._size
+        if start + len(packed_rows) > len(self._data):
+            capacity = max(2 * len(self._data), start + len(packed_rows))
+            data = np.zeros((capacity, self._data.shape[1]), dtype=np.uint8)
+            data[:start] = self._data[:start]
+            self._data = data
+        self._data[start : start + len(packed_rows)] = packed_rows
+        self._size += len(packed_rows)
+        return range(start, self._size)
+
+    def set_packed(self, idx, packed_row):
+        self._data[idx] = packed_row
+
+    def unpack(self, idx=slice(None)) -> np.ndarray:
+        """
+        Bits of the rows (2-D array of uint8), or of the row if idx is an int
+        """
+        return np.unpackbits(self.packed[idx], axis=-1, count=self._width)
+
+    def key(self, idx) -> bytes:
+        return self._data[idx].tobytes()
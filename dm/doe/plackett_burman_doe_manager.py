@@ -0,0 +1,164 @@
+import logging
+import functools
+import numpy as np
+from .doe_manager import DoEManager
+from .packed import CHUNK_CELLS
+
+root_logger = logging.getLogger()
+
+
+def is_prime(n) -> bool:
+    if n < 2:
+        return False
+    return all(n % d for d in range(2, int(n**0.5) + 1))
+
+
+def get_quadratic_character(q) -> np.ndarray:
+    """
+    Legendre symbol of 0..q-1 modulo the odd prime q: 0, 1 (nonzero square) or -1
+    """
+    character = -np.ones(q, dtype=np.int8)
+    character[(np.arange(1, q, dtype=np.int64) ** 2) % q] = 1
+    character[0] = 0
+    return character
+
+
+@functools.lru_cache(maxsize=None)
+def get_hadamard_rows(order):
+    """
+    Rows of a normalized (first column of +1) Hadamard matrix of the order,
+    built by the Sylvester/Kronecker and the Paley constructions
+    :return: function (start, stop) -> rows start..stop-1 (2-D array of +1/-1),
+    or None if the order is not constructible this way
+    """
+    if order == 1:
+        return lambda start, stop: np.ones((stop - start, 1), dtype=np.int8)
+    if order == 2:
+        return lambda start, stop: np.array([[1, 1], [1, -1]], dtype=np.int8)[start:stop]
+    if order % 4:
+        return None
+    if order & (order - 1) == 0:
+        return _get_sylvester_rows(order)
+    if is_prime(order - 1) and (order - 1) % 4 == 3:
+        return _get_paley1_rows(order - 1)
+    if is_prime(order // 2 - 1) and (order // 2 - 1) % 4 == 1:
+        return _get_paley2_rows(order // 2 - 1)
+    for lhs_order in range(2, int(order**0.5) + 1):
+        if order % lhs_order == 0:
+            lhs_rows = get_hadamard_rows(lhs_order)
+            rhs_rows = get_hadamard_rows(order // lhs_order)
+            if lhs_rows is not None and rhs_rows is not None:
+                return _get_kronecker_rows(lhs_rows, rhs_rows, order // lhs_order)
+    return None
+
+
+def _get_sylvester_rows(order):
+    """
+    Sylvester construction (order = 2^k): H[r][c] = (-1)^popcount(r & c)
+    """
+
+    def rows(start, stop):
+        cells = np.arange(start, stop)[:, None] & np.arange(order)[None, :]
+        parity = np.zeros(cells.shape, dtype=np.int8)
+        while cells.any():
+            parity ^= (cells & 1).astype(np.int8)
+            cells >>= 1
+        return 1 - 2 * parity
+
+    return rows
+
+
+def _get_kronecker_rows(lhs_rows, rhs_rows, rhs_order):
+    """
+    Kronecker product of the Hadamard matrices (of the rows lhs_rows and rhs_rows)
+    """
+
+    def rows(start, stop):
+        row_idx = np.arange(start, stop)
+        lhs_start = start // rhs_order
+        lhs = lhs_rows(lhs_start, (stop - 1) // rhs_order + 1)[row_idx // rhs_order - lhs_start]
+        if stop - start >= rhs_order or start % rhs_order > (stop - 1) % rhs_order:
+            rhs = rhs_rows(0, rhs_order)[row_idx % rhs_order]
+        else:
+            rhs = rhs_rows(start % rhs_order, (stop - 1) % rhs_order + 1)
+        return (lhs[:, :, None] * rhs[:, None, :]).reshape(len(row_idx), -1)
+
+    return rows
+
+
+def _get_paley1_rows(q):
+    """
+    Paley construction I (q prime, q = 3 mod 4): I + [[0, 1], [-1, Q]] with the
+    Jacobsthal matrix Q[a][b] = character(b - a), rows normalized
+    """
+    character = get_quadratic_character(q)
+
+    def rows(start, stop):
+        row_idx = np.arange(start, stop)
+        matrix = np.ones((len(row_idx), q + 1), dtype=np.int8)
+        a = row_idx[row_idx > 0] - 1
+        jacobsthal = character[(np.arange(q)[None, :] - a[:, None]) % q]
+        jacobsthal[np.arange(len(a)), a] = 1
+        matrix[row_idx > 0, 1:] = -jacobsthal
+        return matrix
+
+    return rows
+
+
+def _get_paley2_rows(q):
+    """
+    Paley construction II (q prime, q = 1 mod 4): C x [[1, -1], [-1, -1]] + I x
+    [[1, 1], [1, -1]] with C = [[0, 1], [1, Q]], rows normalized
+    """
+    character = get_quadratic_character(q)
+    block = np.array([[1, -1], [-1, -1]], dtype=np.int8)
+    diagonal_block = np.array([[1, 1], [1, -1]], dtype=np.int8)
+
+    def rows(start, stop):
+        row_idx = np.arange(start, stop)
+        i, s = row_idx // 2, row_idx % 2
+        conference = np.ones((len(row_idx), q + 1), dtype=np.int8)
+        conference[i > 0, 1:] = character[(np.arange(q)[None, :] - i[i > 0, None] + 1) % q]
+        conference[np.arange(len(row_idx)), i] = 0
+        matrix = conference[:, :, None] * block[s][:, None, :]
+        matrix[np.arange(len(row_idx)), i] = diagonal_block[s]
+        matrix = matrix.reshape(len(row_idx), -1)
+        return matrix * matrix[:, :1]
+
+    return rows
+
+
+class PlackettBurmanDoEManager(DoEManager):
+    """
+    Plackett-Burman design: the columns 1..factor_size of a Hadamard matrix of
+    the smallest constructible order N > factor_size (N = 0 mod 4), deleting
+    the factors of -1, i.e. N runs (with the run deleting nothing).
+    """
+
+    def __init__(
+        self,
+        factor_manager,
+        response_manager,
+        max_expr,
+        plan_path=None,
+        expr_idx_range=None,
+    ):
+        super().__init__(factor_manager, response_manager, max_expr, plan_path, expr_idx_range)
+
+    def _init_factor_queue(self, plan_path=None, expr_idx_range=None):
+        if plan_path is not None and expr_idx_range is not None:
+            super()._init_factor_queue(plan_path, expr_idx_range)
+        else:
+            self.add_factor([0] * self._factor_size)
+            self.add_factor_chunks(self._generate_factor_chunks())
+
+    def _generate_factor_chunks(self):
+        order = self._factor_size + 1 + (-(self._factor_size + 1) % 4)
+        while get_hadamard_rows(order) is None:
+            order += 4
+        root_logger.info("Plackett-Burman design: {} runs".format(order))
+        hadamard_rows = get_hadamard_rows(order)
+        chunk_size = max(1, CHUNK_CELLS // order)
+        for start in range(0, order, chunk_size):
+            rows = hadamard_rows(start, min(start + chunk_size, order))
+            yield (rows[:, 1 : self._factor_size + 1] < 0).astype(np.int8)
@@ -0,0 +1,116 @@
+import collections
+import numpy as np
+from .packed import PackedBitMatrix
+
+
+class PlanCursor:
+    """
+    Plan produced lazily from sources of packed factor chunks (2-D arrays of
+    packed rows), read through a cursor.
+
+    The sources are consumed in order, and only as far as the rows are
+    needed. Duplicated rows are planned once, and counted.
+    """
+
+    def __init__(self, width):
+        self._rows = PackedBitMatrix(width)
+        self._counts = []
+        self._index = {}
+        self._sources = collections.deque()
+        self._position = 0
+
+    def __len__(self):
+        """
+        Number of the rows produced so far
+        """
+        return len(self._rows)
+
+    def __getitem__(self, idx):
+        """
+        Bits of the row idx, producing the rows up to it if needed
+        """
+        self._fill(idx + 1)
+        if idx >= len(self._rows):
+            raise IndexError("Plan index out of range({})".format(idx))
+        return self._rows.unpack(idx)
+
+    @property
+    def position(self):
+        return self._position
+
+    @property
+    def qsize(self):
+        """
+        Number of the rows produced but not read yet
+        """
+        return len(self._rows) - self._position
+
+    @property
+    def exhausted(self):
+        return not self._sources
+
+    def extend(self, chunks):
+        """
+        Plan the rows of the chunks (an iterable of packed chunks) after the
+        ones already planned
+        """
+        self._sources.append(iter(chunks))
+
+    def next(self):
+        """
+        Bits of the row at the cursor, or None at the end of the plan
+        """
+        self._fill(self._position + 1)
+        if self._position >= len(self._rows):
+            return None
+        self._position += 1
+        return self._rows.unpack(self._position - 1)
+
+    def exhaust(self):
+        """
+        Produce every row of the sources
+        """
+        self._fill(None)
+        return self
+
+    def rows(self, start=0, stop=None) -> PackedBitMatrix:
+        """
+        Rows produced so far from start to stop - 1 (view)
+        """
+        return PackedBitMatrix.from_packed(self._rows.packed[start:stop], self._rows.width)
+
+    def counts(self, start=0, stop=None) -> [int]:
+        return self._counts[start:stop]
+
+    def new_rows(self, packed_rows) -> np.ndarray:
+        """
+        Mask of the packed rows which would be planned: the first occurrence of
+        each row not planned yet
+        """
+        keys = np.ascontiguousarray(packed_rows).view(np.dtype((np.void, packed_rows.shape[1])))
+        _, first = np.unique(keys.ravel(), return_index=True)
+        new = np.zeros(len(packed_rows), dtype=bool)
+        new[first] = [packed_rows[i].tobytes() not in self._index for i in first]
+        return new
+
+    def _fill(self, size):
+        while self._sources and (size is None or len(self._rows) < size):
+            chunk = next(self._sources[0], None)
+            if chunk is None:
+                self._sources.popleft()
+            else:
+                self._add_packed(chunk)
+
+    def _add_packed(self, packed_rows):
+        new_rows = []
+        for i, packed_row in enumerate(packed_rows):
+            key = packed_row.tobytes()
+            idx = self._index.get(key)
+            if idx is None:
+                self._index[key] = len(self._counts)
+                self._counts.append(1)
+                new_rows.append(i)
+            else:
+                self._counts[idx] += 1
+        if new_rows:
+            self._rows.append_packed(packed_rows[new_rows])
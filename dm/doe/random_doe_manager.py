@@ -1,11 +1,28 @@
+import math
 import numpy as np
 import logging
 from .doe_manager import DoEManager
+from .packed import PackedBitMatrix, CHUNK_CELLS
 
 root_logger = logging.getLogger()
 
+MIN_BATCH_SIZE = 64
+# Factors are drawn one by one for the thresholds in [DENSE_THRESHOLD, 1 - DENSE_THRESHOLD]
+DENSE_THRESHOLD = 1 / 16
+
 
 class RandomDoEManager(DoEManager):
+    """
+    Delete every factor with the probability threshold, until max_expr
+    distinct factors are planned.
+
+    Factors are sampled in batches, at once for the high thresholds, or by
+    drawing the deletion count of every row and then its deleted factors.
+    With stratify, the rows of a batch are allocated to the deletion counts
+    in proportion to their (binomial) probability, instead of drawing the
+    deletion count of every row independently.
+    """
+
     def __init__(
         self,
         factor_manager,
@@ -15,12 +32,17 @@ class RandomDoEManager(DoEManager):
         seed=None,
         plan_path=None,
         expr_idx_range=None,
+        stratify=False,
     ):
         self._threshold = threshold
+        self._stratify = stratify
+        self._deletion_count_pmf = None
         if seed:
             print("Numpy random seed: {}".format(seed))
             root_logger.debug("Numpy random seed: {}".format(seed))
-            np.random.seed(int(seed))
+            self._rng = np.random.default_rng(int(seed))
+        else:
+            self._rng = np.random.default_rng()
         super().__init__(factor_manager, response_manager, max_expr, plan_path, expr_idx_range)
 
     def _init_factor_queue(self, plan_path=None, expr_idx_range=None):
@@ -28,7 +50,107 @@ class RandomDoEManager(DoEManager):
             super()._init_factor_queue(plan_path, expr_idx_range)
         else:
             self.add_factor([0] * self._factor_size)
-            while self.qsize < self._max_expr:
-                sample = np.random.uniform(size=self._factor_size)
-                self.add_factor((sample < self._threshold).astype(int))
-            self._expr_idx_range = range(self.qsize)
+            self._plan.extend(self._generate_packed_chunks())
+
+    def _generate_packed_chunks(self):
+        """
+        Batches of revised and packed random factors, cut after the row which
+        makes max_expr distinct factors planned
+        """
+        batch_size = max(1, CHUNK_CELLS // self._factor_size)
+        while len(self._plan) < self._max_expr:
+            need = self._max_expr - len(self._plan)
+            factors = self._sample_factors(min(batch_size, max(need, MIN_BATCH_SIZE)))
+            packed = PackedBitMatrix.pack(self._revise_factors(factors))
+            new_cnt = np.cumsum(self._plan.new_rows(packed))
+            yield packed[: np.searchsorted(new_cnt, need) + 1]
+
+    def _sample_deletion_counts(self, size) -> np.ndarray:
+        if not self._stratify:
+            return self._rng.binomial(self._factor_size, self._threshold, size)
+        share = size * self._get_deletion_count_pmf()
+        counts = np.floor(share).astype(np.int64)
+        # The rest of the rows go to the strata drawn by their remainders
+        remainder = share - counts
+        rest = size - counts.sum()
+        if rest > 0:
+            strata = self._rng.choice(
+                len(counts), rest, replace=False, p=remainder / remainder.sum()
+            )
+            counts[strata] += 1
+        return self._rng.permutation(np.repeat(np.arange(len(counts)), counts))
+
+    def _get_deletion_count_pmf(self) -> np.ndarray:
+        if self._deletion_count_pmf is not None:
+            return self._deletion_count_pmf
+        n, p = self._factor_size, self._threshold
+        if p <= 0.0 or p >= 1.0:
+            pmf = np.zeros(n + 1)
+            pmf[0 if p <= 0.0 else n] = 1.0
+        else:
+            log_pmf = np.array(
+                [
+                    math.lgamma(n + 1)
+                    - math.lgamma(k + 1)
+                    - math.lgamma(n - k + 1)
+                    + k * math.log(p)
+                    + (n - k) * math.log1p(-p)
+                    for k in range(n + 1)
+                ]
+            )
+            pmf = np.exp(log_pmf)
+        self._deletion_count_pmf = pmf / pmf.sum()
+        return self._deletion_count_pmf
+
+    def _sample_factors(self, size) -> np.ndarray:
+        """
+        Rows of factors, each one deleting every factor with the probability threshold
+        """
+        if not self._stratify and DENSE_THRESHOLD <= self._threshold <= 1 - DENSE_THRESHOLD:
+            return self._rng.random((size, self._factor_size), dtype=np.float32) < self._threshold
+        return self._sample_sparse_factors(self._sample_deletion_counts(size))
+
+    def _sample_sparse_factors(self, counts) -> np.ndarray:
+        """
+        Rows of factors, each one deleting a uniformly random set of counts[row] factors
+        """
+        factor_size = self._factor_size
+        # Draw the smaller one of the deleted and the kept sets, complemented afterwards
+        complement = counts > factor_size // 2
+        drawn = np.where(complement, factor_size - counts, counts)
+        if drawn.mean() < DENSE_THRESHOLD * factor_size:
+            factors = np.zeros((len(counts), factor_size), dtype=bool)
+            self._fill_factors(factors, drawn)
+        else:
+            # Draw about drawn[row] factors at once, and then fix the counts: a row
+            # with too many factors is complemented to draw the factors to keep
+            factors = self._rng.random((len(counts), factor_size), np.float32)
+            factors = factors < (drawn / factor_size).astype(np.float32)[:, None]
+            drawn_cnt = factors.sum(axis=1)
+            over = drawn_cnt > drawn
+            factors[over] = ~factors[over]
+            drawn_cnt[over] = factor_size - drawn_cnt[over]
+            drawn = np.where(over, factor_size - drawn, drawn)
+            complement = complement ^ over
+            self._fill_factors(factors, drawn - drawn_cnt)
+        factors[complement] = ~factors[complement]
+        return factors
+
+    def _fill_factors(self, factors, missing):
+        """
+        Add missing[row] uniformly random factors to every row: the missing
+        factors of all the rows are drawn at once, and only the ones drawn
+        twice (or already in the row) are drawn again
+        """
+        factor_size = self._factor_size
+        rows = np.nonzero(missing)[0]
+        missing = missing[rows]
+        while len(rows):
+            row_idx = np.repeat(rows, missing)
+            col_idx = self._rng.integers(0, factor_size, len(row_idx))
+            # Sorted, distinct cells not in the rows yet
+            cells = np.sort((row_idx * factor_size + col_idx)[~factors[row_idx, col_idx]])
+            cells = cells[np.concatenate(([True], cells[1:] != cells[:-1]))[: len(cells)]]
+            factors[cells // factor_size, cells % factor_size] = True
+            missing = missing - np.bincount(cells // factor_size, minlength=len(factors))[rows]
+            rows, missing = rows[missing > 0], missing[missing > 0]
@@ -0,0 +1,361 @@
+import collections
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+
+root_logger = logging.getLogger()
+
+# Per-process state of the parallel workers (set by _init_worker)
+_worker = None
+
+
+def _init_worker(factor_manager, response_manager, save_generated, save_log, slot_queue):
+    global _worker
+    _worker = {
+        "factor_manager": factor_manager,
+        "response_manager": response_manager,
+        "save_generated": save_generated,
+        "save_log": save_log,
+        "work_name": "work{}".format(slot_queue.get()),
+    }
+
+
+def _run_experiment(iter_cnt, factor):
+    response_manager = _worker["response_manager"]
+    program_path = _worker["factor_manager"].create_program(
+        factor, iter_cnt, _worker["save_generated"], work_name=_worker["work_name"]
+    )
+    response = response_manager.get_response(program_path, _worker["save_log"])
+    return response, response_manager.pop_cache_hits()
+
+
+class Executor:
+    """
+    Run the experiments planned by the DoE manager, one at a time.
+
+    With a journal (dm.journal.Journal), every observation is journaled as
+    it is recorded, and the experiments replayed from the journal are skipped.
+    With a monitor (dm.convergence.ConvergenceMonitor), the DoE manager is
+    stopped once the inferred slices converge.
+    """
+
+    def __init__(
+        self,
+        factor_manager,
+        response_manager,
+        save_generated,
+        save_log,
+        journal=None,
+        monitor=None,
+    ):
+        self._factor_manager = factor_manager
+        self._response_manager = response_manager
+        self._save_generated = save_generated
+        self._save_log = save_log
+        self._journal = journal
+        self._monitor = monitor
+        # iteration count -> factor of the experiments replayed from the journal
+        self._finished = {}
+
+    def replay(self, doe_manager):
+        """
+        Append the observations of the journal to the DoE manager.
+        :return: the number of the replayed observations
+        """
+        for iter_cnt, factor, response in self._journal.replay():
+            doe_manager.append(factor, response)
+            self._finished[iter_cnt] = factor
+            if self._monitor is not None:
+                self._monitor.update(doe_manager)
+        return len(self._finished)
+
+    def _get_next_factor(self, doe_manager, iter_cnt):
+        """
+        Next factor of the DoE manager and its iteration count, skipping the
+        experiments replayed from the journal
+        """
+        factor = doe_manager.get_next_factor()
+        while factor is not None and iter_cnt in self._finished:
+            if list(factor) != self._finished[iter_cnt]:
+                raise Exception("Journal differs from the plan(iter idx: {})".format(iter_cnt))
+            iter_cnt += 1
+            factor = doe_manager.get_next_factor()
+        return factor, iter_cnt
+
+    def run(self, doe_manager, iter_cnt):
+        """
+        Run experiments until the DoE manager runs out of factors.
+        :return: the iteration count after the last experiment
+        """
+        factor, iter_cnt = self._get_next_factor(doe_manager, iter_cnt)
+        while factor is not None:
+            root_logger.info("Iter idx: {}, Qsize: {}".format(iter_cnt, doe_manager.qsize))
+            root_logger.info("Curr factor: {}".format(factor))
+            program_path = self._factor_manager.create_program(
+                factor, iter_cnt, self._save_generated
+            )
+            response = self._response_manager.get_response(program_path, self._save_log)
+            self._record(doe_manager, iter_cnt, factor, response)
+            factor, iter_cnt = self._get_next_factor(doe_manager, iter_cnt + 1)
+        return iter_cnt
+
+    def _record(self, doe_manager, iter_cnt, factor, response):
+        root_logger.info("Response: {}".format(response))
+        doe_manager.append(factor, response)
+        if self._journal is not None:
+            self._journal.append(iter_cnt, factor, response)
+        if self._monitor is not None:
+            self._monitor.update(doe_manager)
+
+
+class ParallelExecutor(Executor):
+    """
+    Run the experiments on a pool of worker processes.
+
+    Every worker owns its own work directory (work0, work1, ...), and responses
+    are appended to the DoE manager in the order the factors were planned, so
+    the observations are the same as the ones of a serial run.
+    """
+
+    def __init__(
+        self,
+        factor_manager,
+        response_manager,
+        save_generated,
+        save_log,
+        jobs,
+        journal=None,
+        monitor=None,
+    ):
+        super().__init__(
+            factor_manager, response_manager, save_generated, save_log, journal, monitor
+        )
+        self._jobs = jobs
+
+    def run(self, doe_manager, iter_cnt):
+        # fork: workers inherit the (possibly unpicklable) factor manager
+        context = multiprocessing.get_context("fork")
+        slot_queue = context.Queue()
+        for slot in range(self._jobs):
+            slot_queue.put(slot)
+        initargs = (
+            self._factor_manager,
+            self._response_manager,
+            self._save_generated,
+            self._save_log,
+            slot_queue,
+        )
+        with context.Pool(self._jobs, _init_worker, initargs) as pool:
+            in_flight = collections.deque()
+            while True:
+                # Keep every worker busy, with one spare task each
+                factor = None
+                if len(in_flight) < 2 * self._jobs:
+                    factor, iter_cnt = self._get_next_factor(doe_manager, iter_cnt)
+                if factor is not None:
+                    root_logger.info("Iter idx: {}, Qsize: {}".format(iter_cnt, doe_manager.qsize))
+                    root_logger.info("Curr factor: {}".format(factor))
+                    result = pool.apply_async(_run_experiment, (iter_cnt, factor))
+                    in_flight.append((iter_cnt, factor, result))
+                    iter_cnt += 1
+                elif in_flight:
+                    # The DoE manager may plan more factors once it gets responses
+                    done_cnt, done_factor, result = in_flight.popleft()
+                    response, cache_hits = result.get()
+                    # Every worker keeps its own response cache
+                    self._response_manager.add_cache_hits(cache_hits)
+                    self._record(doe_manager, done_cnt, done_factor, response)
+                else:
+                    break
+        return iter_cnt
+
+
+class _Stage(threading.Thread):
+    """
+    Pipeline stage thread: take an experiment from in_queue, process it, and
+    pass it to out_queue. Keeps the time spent working and waiting.
+    """
+
+    def __init__(self, name, func, in_queue, out_queue):
+        super().__init__(name=name, daemon=True)
+        self._func = func
+        self._in_queue = in_queue
+        self._out_queue = out_queue
+        self.busy_time = 0.0
+        self.starved_time = 0.0
+        self.blocked_time = 0.0
+        self.processed = 0
+
+    def run(self):
+        while True:
+            start = time.perf_counter()
+            expr = self._in_queue.get()
+            got = time.perf_counter()
+            self.starved_time += got - start
+            if expr is None:
+                self._out_queue.put(None)
+                return
+            if "error" not in expr:
+                try:
+                    self._func(expr)
+                except Exception as e:
+                    expr["error"] = e
+                self.processed += 1
+            done = time.perf_counter()
+            self.busy_time += done - got
+            self._out_queue.put(expr)
+            self.blocked_time += time.perf_counter() - done
+
+
+class PipelineExecutor(Executor):
+    """
+    Run the generate, compile and test phases of the experiments on separate
+    threads connected by bounded queues, so that the next program is generated
+    while the current one is compiled and tested.
+
+    Every experiment in flight owns its own work directory (work0, work1, ...),
+    and responses are appended to the DoE manager in the planned order.
+    """
+
+    def __init__(
+        self,
+        factor_manager,
+        response_manager,
+        save_generated,
+        save_log,
+        queue_size,
+        journal=None,
+        monitor=None,
+    ):
+        super().__init__(
+            factor_manager, response_manager, save_generated, save_log, journal, monitor
+        )
+        self._queue_size = queue_size
+
+    def _generate(self, expr):
+        expr["program_path"] = self._factor_manager.create_program(
+            expr["factor"], expr["iter_cnt"], self._save_generated, work_name=expr["work_name"]
+        )
+
+    def _compile(self, expr):
+        expr["compiled"] = self._response_manager.compile(expr["program_path"])
+
+    def _test(self, expr):
+        expr["response"] = self._response_manager.test(
+            expr["program_path"], expr["compiled"], self._save_log
+        )
+
+    def run(self, doe_manager, iter_cnt):
+        stage_funcs = [
+            ("generate", self._generate),
+            ("compile", self._compile),
+            ("test", self._test),
+        ]
+        queues = [queue.Queue(maxsize=self._queue_size) for _ in stage_funcs]
+        # Results are collected by this thread, the queue needs no bound
+        queues.append(queue.Queue())
+        stages = [
+            _Stage(name, func, queues[idx], queues[idx + 1])
+            for idx, (name, func) in enumerate(stage_funcs)
+        ]
+        # Every stage and every queue in between can hold an experiment
+        free_slots = list(range(len(stages) * (self._queue_size + 1)))
+
+        start = time.perf_counter()
+        for stage in stages:
+            stage.start()
+        in_flight = 0
+        try:
+            while True:
+                factor = None
+                if free_slots:
+                    factor, iter_cnt = self._get_next_factor(doe_manager, iter_cnt)
+                if factor is not None:
+                    root_logger.info("Iter idx: {}, Qsize: {}".format(iter_cnt, doe_manager.qsize))
+                    root_logger.info("Curr factor: {}".format(factor))
+                    slot = free_slots.pop(0)
+                    queues[0].put(
+                        {
+                            "iter_cnt": iter_cnt,
+                            "factor": factor,
+                            "slot": slot,
+                            "work_name": "work{}".format(slot),
+                        }
+                    )
+                    in_flight += 1
+                    iter_cnt += 1
+                elif in_flight:
+                    # Stages are FIFO, so the experiments finish in the planned order
+                    expr = queues[-1].get()
+                    in_flight -= 1
+                    if "error" in expr:
+                        raise expr["error"]
+                    free_slots.append(expr["slot"])
+                    self._record(doe_manager, expr["iter_cnt"], expr["factor"], expr["response"])
+                else:
+                    break
+        finally:
+            queues[0].put(None)
+        for stage in stages:
+            stage.join()
+        self.log_stage_statistics(stages, time.perf_counter() - start)
+        return iter_cnt
+
+    @staticmethod
+    def log_stage_statistics(stages, wall_time):
+        root_logger.info("Pipeline wall time: {:.2f}s".format(wall_time))
+        for stage in stages:
+            root_logger.info(
+                "Stage {}: processed {}, occupancy {:.1%}, busy {:.2f}s, "
+                "starved {:.2f}s, blocked {:.2f}s".format(
+                    stage.name,
+                    stage.processed,
+                    stage.busy_time / wall_time if wall_time else 0.0,
+                    stage.busy_time,
+                    stage.starved_time,
+                    stage.blocked_time,
+                )
+            )
+        bottleneck = max(stages, key=lambda stage: stage.busy_time)
+        root_logger.info("Bottleneck stage: {}".format(bottleneck.name))
+
+
+def get_executor(
+    factor_manager,
+    response_manager,
+    save_generated,
+    save_log,
+    jobs=1,
+    pipeline=False,
+    queue_size=1,
+    journal=None,
+    monitor=None,
+):
+    if jobs <= 0:
+        raise Exception("Invalid jobs({})".format(jobs))
+    elif pipeline:
+        if jobs != 1:
+            raise Exception(
+                "Pipeline executor runs a single experiment per stage(jobs: {})".format(jobs)
+            )
+        if queue_size <= 0:
+            raise Exception("Invalid queue_size({})".format(queue_size))
+        return PipelineExecutor(
+            factor_manager,
+            response_manager,
+            save_generated,
+            save_log,
+            queue_size,
+            journal,
+            monitor,
+        )
+    elif jobs == 1:
+        return Executor(
+            factor_manager, response_manager, save_generated, save_log, journal, monitor
+        )
+    else:
+        return ParallelExecutor(
+            factor_manager, response_manager, save_generated, save_log, jobs, journal, monitor
+        )
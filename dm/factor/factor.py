@@ -2,10 +2,12 @@ from .line_factor_manager import LineFactorManager
 from .srcml_factor_manager import SrcMLFactorManager
 
 
-def get_factor_manager(factor_level, proj_name, program_space):
+def get_factor_manager(
+    factor_level, proj_name, program_space, parse_cache=True, unit_artifacts="sync"
+):
     if factor_level == "line":
         return LineFactorManager(program_space)
     elif factor_level == "srcml":
-        return SrcMLFactorManager(proj_name, program_space)
+        return SrcMLFactorManager(proj_name, program_space, parse_cache, unit_artifacts)
     else:
         raise Exception("Invalid factor_level: {}".format(factor_level))
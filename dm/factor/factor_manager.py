@@ -1,6 +1,7 @@
 import os
-import shutil
 import logging
+import numpy as np
+from ..work_dir_pool import WorkDirPool
 from abc import ABC, abstractmethod, ABCMeta
 
 root_logger = logging.getLogger()
@@ -12,32 +13,24 @@ class FactorManager(ABC):
     @abstractmethod
     def __init__(self, program_space):
         self._program_space = program_space
+        self._work_dir_pool = WorkDirPool(program_space)
         self._factor = None
         self._size = 0
 
     @abstractmethod
-    def create_program(self, factor, iter_cnt, save_flag, only_code=False):
-        work_dir = self.get_work_dir(iter_cnt, save_flag)
-        if os.path.isdir(work_dir):
-            shutil.rmtree(work_dir)
-        if only_code:
-            os.makedirs(work_dir)
-            for filename in self._program_space.files:
-                shutil.copy(
-                    os.path.join(self._program_space.orig_dir, filename),
-                    os.path.join(work_dir, filename),
-                )
-        else:
-            work_dir = shutil.copytree(self._program_space.orig_dir, work_dir)
+    def create_program(self, factor, iter_cnt, save_flag, only_code=False, work_name="work"):
+        work_dir = self.get_work_dir(iter_cnt, save_flag, work_name)
+        # The target source files are written by the subclasses
+        self._work_dir_pool.sync(work_dir, only_code)
         with open(os.path.join(work_dir, "factor"), "w") as f:
             f.write(str(factor))
         return work_dir
 
-    def get_work_dir(self, iter_cnt, save_flag):
+    def get_work_dir(self, iter_cnt, save_flag, work_name="work"):
         if save_flag:
             return os.path.join(self._program_space.base_work_dir, str(iter_cnt))
         else:
-            return os.path.join(self._program_space.base_work_dir, "work")
+            return os.path.join(self._program_space.base_work_dir, work_name)
 
     def revise_factor(self, factor):
         return factor
@@ -45,6 +38,40 @@ class FactorManager(ABC):
     def is_valid_factor(self, factor):
         return True
 
+    def revise_factors(self, factors):
+        """
+        revise_factor on every row of the 2-D array of factors
+        """
+        return np.asarray(factors, dtype=np.int8)
+
+    def valid_factors(self, factors):
+        """
+        is_valid_factor on every row of the 2-D array of factors
+        """
+        return np.ones(len(factors), dtype=bool)
+
+    def deletable_factors(self, factors):
+        """
+        revise_factors on every row of the 2-D array of factors, keeping the
+        factors which can not be deleted, so that every row is valid
+        """
+        return self.revise_factors(factors)
+
+    def get_child_factors(self, factor_idx=None) -> [int]:
+        """
+        Factors directly contained in the factor, or the outermost factors if
+        factor_idx is None, in source order
+        """
+        if factor_idx is None:
+            return list(range(self.size))
+        return []
+
+    def close(self):
+        """
+        Wait for the background work of the factor manager (none by default)
+        """
+        pass
+
     @property
     def size(self):
         return self._size
@@ -23,8 +23,8 @@ class LineFactorManager(FactorManager):
         root_logger.debug("self._size = {}".format(self._size))
         root_logger.debug("self._factor[0] = {}".format(self._factor[0]))
 
-    def create_program(self, factor, iter_cnt, save_flag, only_code=False):
-        work_dir = super().create_program(factor, iter_cnt, save_flag, only_code)
+    def create_program(self, factor, iter_cnt, save_flag, only_code=False, work_name="work"):
+        work_dir = super().create_program(factor, iter_cnt, save_flag, only_code, work_name)
 
         sliced_lines = list(
             map(lambda x: (x[1][0], "\n") if x[0] else x[1], tuple(zip(factor, self._factor)))
@@ -2,15 +2,17 @@ import subprocess
 import logging
 import shutil
 import os
-import queue
+import collections
 import xml.etree.ElementTree as ET
 import tempfile
 import copy
+import numpy as np
 
 root_logger = logging.getLogger()
 
 NS = {"ns": "http://www.srcML.org/srcML/src", "pos": "http://www.srcML.org/srcML/position"}
 
+ESCAPE_TAG = "{{{}}}escape".format(NS["ns"])
 LINEKEY = "{{{}}}line".format(NS["pos"])
 COLUMNKEY = "{{{}}}column".format(NS["pos"])
 
@@ -35,6 +37,17 @@ c_stmt_tag = basic_tag + [
 # maybe should include <then>, <else>, <elseif>
 # Todo: Java tag
 
+# Namespaced tags, formatted once
+STMT_TAGS = frozenset("{{{}}}{}".format(NS["ns"], stmt_tag) for stmt_tag in c_stmt_tag)
+EXPR_TAG = "{{{}}}expr".format(NS["ns"])
+EXPR_STMT_TAG = "{{{}}}expr_stmt".format(NS["ns"])
+DECL_TAGS = frozenset("{{{}}}{}".format(NS["ns"], tag) for tag in ["function_decl", "decl_stmt"])
+RETURN_TAG = "{{{}}}return".format(NS["ns"])
+NAME_TAG = "{{{}}}name".format(NS["ns"])
+OPERATOR_TAG = "{{{}}}operator".format(NS["ns"])
+LITERAL_TAG = "{{{}}}literal".format(NS["ns"])
+POSITION_TAG = "{{{}}}position".format(NS["pos"])
+
 
 def is_before(pos1: dict, pos2: dict) -> bool:
     return pos1["line"] < pos2["line"] or (
@@ -48,7 +61,34 @@ def node_statistics(node: ET.Element) -> str:
 
 def xml_to_code(tree: ET) -> bytes:
     """
-    srcml tree to code of byte string
+    srcml tree to code of byte string.
+    srcML is a lossless markup, so the code is the text of the tree in
+    document order (text and tail of every node, except the tail of the root).
+
+    :param tree: xml.etree.ElementTree of source code
+    :return: ByteString of code
+    """
+    return "".join(iter_code(tree.getroot())).encode("utf-8")
+
+
+def iter_code(node: ET.Element):
+    """
+    Generate the code fragments of the node (without its tail)
+    """
+    if node.tag == ESCAPE_TAG:
+        # Characters not allowed in XML, e.g. <escape char="0xc"/>
+        yield chr(int(node.attrib["char"], 16))
+    elif node.text:
+        yield node.text
+    for child in node:
+        yield from iter_code(child)
+        if child.tail:
+            yield child.tail
+
+
+def xml_to_code_srcml(tree: ET) -> bytes:
+    """
+    srcml tree to code of byte string, using srcml
 
     :param tree: xml.etree.ElementTree of source code
     :return: ByteString of code
@@ -146,11 +186,7 @@ def is_stmt_tag(tag: str) -> bool:
     """
 
     # Todo java
-    for stmt_tag in c_stmt_tag:
-        NS_tag = "{{{}}}{}".format(NS["ns"], stmt_tag)
-        if NS_tag == tag:
-            return True
-    return False
+    return tag in STMT_TAGS
 
 
 def is_expr_tag(tag: str) -> bool:
@@ -162,18 +198,18 @@ def is_expr_tag(tag: str) -> bool:
     """
 
     # Todo java
-    return tag == "{{{}}}expr".format(NS["ns"])
+    return tag == EXPR_TAG
 
 
 def is_pos_node(node: ET.Element) -> bool:
-    return node.tag == "{{{}}}position".format(NS["pos"])
+    return node.tag == POSITION_TAG
 
 
 def is_ORBS_print_node(node: ET.Element) -> bool:
     """
     Get node with expr tag, return if is is a printf statement logging ORBS log
     """
-    assert node.tag == "{{{}}}expr".format(NS["ns"])
+    assert node.tag == EXPR_TAG
     expr_call_path = "./ns:call"
     expr_call_name_path = os.path.join(expr_call_path, "ns:name")
     expr_call_arg_literal_path = os.path.join(
@@ -196,7 +232,7 @@ def is_standalone_ORBS_log_node(node: ET.Element) -> bool:
     Get node with stmt tag, return if it is stand-alone ORBS log node or not
     """
     expr_path = "./ns:expr"
-    if node.tag == "{{{}}}expr_stmt".format(NS["ns"]):
+    if node.tag == EXPR_STMT_TAG:
         expr_node = node.find(expr_path, NS)
         if expr_node is not None:
             return is_ORBS_print_node(expr_node)
@@ -223,23 +259,21 @@ def is_decl_node(node: ET.Element) -> bool:
     """
     get node with stmt tag, return if it is decl node or not
     """
-    return node.tag == "{{{}}}function_decl".format(
-        NS["ns"]
-    ) or node.tag == "{{{}}}decl_stmt".format(NS["ns"])
+    return node.tag in DECL_TAGS
 
 
 def is_init_node(node: ET.Element) -> bool:
     """
     get node with stmt tag, return if it is init node or not
     """
-    if node.tag == "{{{}}}expr_stmt".format(NS["ns"]):
-        expr_node = node.fine("./ns:expr", NS)
-        if len(expr_node) == 3:
+    if node.tag == EXPR_STMT_TAG:
+        expr_node = node.find("./ns:expr", NS)
+        if expr_node is not None and len(expr_node) == 3:
             if (
-                expr_node[0].tag == "{{{}}}name".format(NS["ns"])
-                and expr_node[1].tag == "{{{}}}operator".format(NS["ns"])
+                expr_node[0].tag == NAME_TAG
+                and expr_node[1].tag == OPERATOR_TAG
                 and expr_node[1].text == "="
-                and expr_node[2].tag == "{{{}}}literal".format(NS["ns"])
+                and expr_node[2].tag == LITERAL_TAG
             ):
                 return True
     return False
@@ -249,7 +283,7 @@ def is_ret_node(node: ET.Element) -> bool:
     """
     get node with stmt tag, return if it is ret node or not
     """
-    return node.tag == "{{{}}}return".format(NS["ns"])
+    return node.tag == RETURN_TAG
 
 
 def copy_tree(tree: ET) -> (ET, {ET.Element: ET.Element}):
@@ -263,27 +297,22 @@ def copy_tree(tree: ET) -> (ET, {ET.Element: ET.Element}):
     return copy_tree, dict(zip(copy_node_list, orig_node_list))
 
 
-def remove_position(tree: ET, parent_dict):
-    node_list = get_bfs_node_list(tree)
-    for node in node_list:
-        if is_pos_node(node):
-            parent_dict[node].remove(node)
-        else:
-            if LINEKEY in node.attrib:
-                node.attrib.pop(LINEKEY)
-                node.attrib.pop(COLUMNKEY)
+def remove_position(tree: ET):
+    for parent_node in list(tree.getroot().iter()):
+        for node in [child for child in parent_node if is_pos_node(child)]:
+            parent_node.remove(node)
+        if LINEKEY in parent_node.attrib:
+            parent_node.attrib.pop(LINEKEY)
+            parent_node.attrib.pop(COLUMNKEY)
 
 
 def get_bfs_node_list(tree: ET) -> [ET.Element]:
-    root = tree.getroot()
-    node_list = []
-    q = queue.Queue()
-    q.put(root)
-    while not q.empty():
-        node = q.get()
-        node_list.append(node)
-        for child in node:
-            q.put(child)
+    node_list = [tree.getroot()]
+    q = collections.deque(node_list)
+    while q:
+        node = q.popleft()
+        node_list.extend(node)
+        q.extend(node)
     return node_list
 
 
@@ -305,6 +334,125 @@ def get_parent_dict_and_stmt(tree: ET) -> ({ET.Element: ET.Element}, [ET.Element
     return parent_dict, stmt_list
 
 
+class TreeIndex:
+    """
+    Array-backed index of a srcML tree, built once per parse.
+
+    Nodes are numbered in preorder. For the node of index i,
+    parent[i] is the index of its parent (-1 for the root), the nodes of its
+    subtree are [i, end[i]), depth[i] is its depth, and tag_table[tag[i]] is
+    its tag. stmt, log and ternary_log flag the stmt nodes (ORBS log nodes
+    excluded), the stand-alone ORBS log nodes and the ternary ORBS log nodes.
+    Position nodes are left out, so the index stays valid after remove_position.
+    """
+
+    def __init__(self, tree: ET):
+        self.nodes = []
+        parent, end, depth, tag = [], [], [], []
+        self.tag_table = []
+        tag_code = {}
+        # (node, parent index, depth) on enter, (None, index, 0) on exit
+        stack = [(tree.getroot(), -1, 0)]
+        while stack:
+            node, parent_idx, node_depth = stack.pop()
+            if node is None:
+                end[parent_idx] = len(self.nodes)
+                continue
+            idx = len(self.nodes)
+            self.nodes.append(node)
+            parent.append(parent_idx)
+            end.append(idx + 1)
+            depth.append(node_depth)
+            if node.tag not in tag_code:
+                tag_code[node.tag] = len(self.tag_table)
+                self.tag_table.append(node.tag)
+            tag.append(tag_code[node.tag])
+            stack.append((None, idx, 0))
+            stack.extend(
+                (child, idx, node_depth + 1) for child in reversed(node) if not is_pos_node(child)
+            )
+        self.index = {node: idx for idx, node in enumerate(self.nodes)}
+        self.parent = np.array(parent, dtype=np.int32)
+        self.end = np.array(end, dtype=np.int32)
+        self.depth = np.array(depth, dtype=np.int32)
+        self.tag = np.array(tag, dtype=np.int16)
+
+        self.stmt_tag = np.array([is_stmt_tag(t) for t in self.tag_table], dtype=bool)[self.tag]
+        expr_tag = np.array([is_expr_tag(t) for t in self.tag_table], dtype=bool)[self.tag]
+        self.log = np.zeros(len(self.nodes), dtype=bool)
+        for idx in np.flatnonzero(self.stmt_tag):
+            self.log[idx] = bool(is_standalone_ORBS_log_node(self.nodes[idx]))
+        self.ternary_log = np.zeros(len(self.nodes), dtype=bool)
+        for idx in np.flatnonzero(expr_tag):
+            self.ternary_log[idx] = is_ternary_ORBS_log_node(self.nodes[idx])
+        self.stmt = self.stmt_tag & np.logical_not(self.log)
+        # Nodes of the same depth are in preorder in BFS order
+        self.bfs = np.lexsort((np.arange(len(self.nodes)), self.depth))
+        self.bfs_rank = np.empty(len(self.nodes), dtype=np.int64)
+        self.bfs_rank[self.bfs] = np.arange(len(self.nodes))
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def parent_of(self, node: ET.Element) -> ET.Element:
+        parent_idx = self.parent[self.index[node]]
+        return self.nodes[parent_idx] if parent_idx >= 0 else None
+
+    def bfs_nodes(self, flag=None) -> [ET.Element]:
+        """
+        Nodes (with the flag) in BFS order, same as get_bfs_node_list
+        """
+        order = self.bfs if flag is None else self.bfs[flag[self.bfs]]
+        return [self.nodes[idx] for idx in order]
+
+    def stmt_nodes(self) -> [ET.Element]:
+        """
+        stmt nodes in BFS order, same as the stmt_list of get_parent_dict_and_stmt
+        """
+        return self.bfs_nodes(self.stmt)
+
+    def bfs_index(self, node: ET.Element) -> int:
+        """
+        Index of the node in get_bfs_node_list of the tree once the positions
+        are removed, same as get_node_index_in_tree
+        """
+        return int(self.bfs_rank[self.index[node]])
+
+    def bfs_nodes_wo_annotation(self) -> [ET.Element]:
+        """
+        Nodes in BFS order once the ORBS log nodes are removed, same as
+        get_bfs_node_list of the tree after remove_annotation_node (and
+        remove_position), without copying the tree: the stand-alone log nodes
+        are left out, and the ternary log nodes are replaced by their
+        condition expr, after the other children of their parent
+        """
+        order = [0]
+        q = collections.deque(order)
+        while q:
+            idx = q.popleft()
+            children, conditions = [], []
+            child = idx + 1
+            while child < self.end[idx]:
+                if self.ternary_log[child]:
+                    condition = self.nodes[child].find(".ns:ternary/ns:condition/ns:expr", NS)
+                    conditions.append(self.index[condition])
+                elif not self.log[child]:
+                    children.append(child)
+                child = self.end[child]
+            order.extend(children + conditions)
+            q.extend(children + conditions)
+        return [self.nodes[idx] for idx in order]
+
+    def get_parent_stmt_node(self, node: ET.Element) -> ET.Element:
+        """
+        Same as get_parent_stmt_node
+        """
+        idx = self.index[node]
+        while idx >= 0 and not self.stmt_tag[idx]:
+            idx = self.parent[idx]
+        return self.nodes[idx] if idx >= 0 else None
+
+
 def delete_node(parent_node: ET.Element, child_node: ET.Element):
     """
     Remove child_node from parent_node.
@@ -341,6 +489,66 @@ def delete_node(parent_node: ET.Element, child_node: ET.Element):
     parent_node.remove(child_node)
 
 
+def delete_node_overlay(
+    parent_node: ET.Element, child_node: ET.Element, removed: set, text: dict, tail: dict
+):
+    """
+    Same as delete_node, but record the deletion in an overlay instead of
+    mutating the tree: the removed nodes, and the revised text and tail of nodes.
+    """
+    children = [node for node in parent_node if node not in removed]
+    child_node_idx = children.index(child_node)
+    if "block" in child_node.tag:
+        if child_node_idx:
+            previous_node = children[child_node_idx - 1]
+            if tail.get(previous_node, previous_node.tail):
+                tail[previous_node] = tail.get(previous_node, previous_node.tail) + ";"
+        else:
+            text[parent_node] = (text.get(parent_node, parent_node.text) or "") + ";"
+    if "block" in parent_node.tag:
+        child_tail = tail.get(child_node, child_node.tail)
+        if child_tail:
+            if child_node_idx:
+                previous_node = children[child_node_idx - 1]
+                previous_tail = tail.get(previous_node, previous_node.tail)
+                tail[previous_node] = (previous_tail or "") + child_tail
+            else:
+                text[parent_node] = (text.get(parent_node, parent_node.text) or "") + child_tail
+    removed.add(child_node)
+
+
+def iter_overlay_code(node: ET.Element, removed: set, text: dict, tail: dict):
+    """
+    Same as iter_code, on the tree with the overlay of delete_node_overlay
+    """
+    if node.tag == ESCAPE_TAG:
+        yield chr(int(node.attrib["char"], 16))
+    else:
+        node_text = text.get(node, node.text)
+        if node_text:
+            yield node_text
+    for child in node:
+        if child in removed:
+            continue
+        yield from iter_overlay_code(child, removed, text, tail)
+        child_tail = tail.get(child, child.tail)
+        if child_tail:
+            yield child_tail
+
+
+def copy_overlay(node: ET.Element, removed: set, text: dict, tail: dict) -> ET.Element:
+    """
+    Copy of the tree with the overlay of delete_node_overlay
+    """
+    copy_node = ET.Element(node.tag, node.attrib)
+    copy_node.text = text.get(node, node.text)
+    copy_node.tail = tail.get(node, node.tail)
+    for child in node:
+        if child not in removed:
+            copy_node.append(copy_overlay(child, removed, text, tail))
+    return copy_node
+
+
 def remove_annotation_node(tree: ET, parent_dict) -> ET:
     """
     Return tree without ORBS log
@@ -386,6 +594,24 @@ def get_node_by_line_col(tree: ET, line: int, col: int) -> ET.Element:
     return None
 
 
+def get_line_col_dict(tree: ET) -> {(int, int): ET.Element}:
+    """
+    (line, col) -> node dict of the tree, same as get_node_by_line_col
+    for every position; a position node is replaced by its parent node.
+    Tree needs position.
+    """
+    line_col_dict = {}
+    stack = [(tree.getroot(), None)]
+    while stack:
+        node, parent_node = stack.pop()
+        if LINEKEY in node.attrib:
+            key = (int(node.attrib[LINEKEY]), int(node.attrib[COLUMNKEY]))
+            if key not in line_col_dict:
+                line_col_dict[key] = parent_node if is_pos_node(node) else node
+        stack.extend((child, node) for child in reversed(node))
+    return line_col_dict
+
+
 def get_parent_stmt_node(child_node: ET.Element, parent_dict: dict) -> ET.Element:
     """
     Get the smallest parent node containing child node.
@@ -415,9 +641,12 @@ def get_node_by_index(tree: ET, index: int) -> ET.Element:
     return node_list[index]
 
 
-def get_stmt_with_log_node(stmt_node: ET.Element, log_node_list: [ET.Element]) -> ET.Element:
+def get_stmt_with_log_node(
+    stmt_node: ET.Element, log_node_list: [ET.Element], position_dict: dict = None
+) -> ET.Element:
     """
     Get merged node which contains stmt_node and log nodes
+    Positions are taken from position_dict (node -> get_position(node)) if given.
     """
     add_log_node_list = list(
         filter(lambda log_node: log_node not in stmt_node.iter(), log_node_list)
@@ -430,7 +659,10 @@ def get_stmt_with_log_node(stmt_node: ET.Element, log_node_list: [ET.Element]) -
         start_pos_list = list(
             map(
                 lambda pos: (pos["line"], pos["column"]),
-                map(lambda node: get_position(node)[0], node_list),
+                map(
+                    lambda node: (position_dict[node] if position_dict else get_position(node))[0],
+                    node_list,
+                ),
             )
         )
         for node, start_pos in sorted(zip(node_list, start_pos_list), key=lambda x: x[1]):
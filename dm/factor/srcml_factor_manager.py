@@ -1,8 +1,12 @@
 import os
-import copy
+import pickle
+import hashlib
+import multiprocessing
 import shutil
 import logging
+import tempfile
 import difflib
+import numpy as np
 import xml.etree.ElementTree as ET
 from .srcml import srcml
 from .factor_manager import FactorManager
@@ -14,7 +18,7 @@ class SrcMLTree:
 
     file_path = None
     tree = None
-    parent_dict = {}
+    index = None
     stmt_list = []
 
     def __init__(
@@ -26,76 +30,49 @@ class SrcMLTree:
         )
         self.tree = srcml.code_to_xml(os.path.join(dir_path, self.filename), True)
         self.sanity_check(dir_path)
-        self.parent_dict, self.stmt_list = srcml.get_parent_dict_and_stmt(self.tree)
+        self.index = srcml.TreeIndex(self.tree)
+        self.stmt_list = self.index.stmt_nodes()
         # size: the number of the stmt node
         self.size = len(list(self.stmt_list))
 
         self.log_dict = self.get_log_dict(dir_path)
+        # Positions of the stmt and ORBS log nodes, for the unit artifacts
+        self.position_dict = {}
+        for stmt_node in self.stmt_list:
+            for node in [stmt_node] + self.log_dict[stmt_node]:
+                self.position_dict[node] = srcml.get_position(node)
 
-        srcml_data_path = os.path.join("output", "unit", project_name)
-        if not os.path.exists(srcml_data_path):
-            save_flag = True
-        if save_flag:
-            if os.path.exists(srcml_data_path):
-                shutil.rmtree(srcml_data_path)
-            os.makedirs(srcml_data_path)
-            self.save_unit(srcml_data_path)
         # remove position
-        srcml.remove_position(self.tree, self.parent_dict)
+        srcml.remove_position(self.tree)
         if save_flag:
-            self.save_left(srcml_data_path)
+            # The directory is shared by the files of the project, and cleared by the factor manager
+            self.save_artifacts(os.path.join("output", "unit", project_name))
 
     def get_log_dict(self, dir_path: str) -> dict:
         """
         Create mapping from stmt node to the list of ORBS log nodes in the stmt
         """
         orig_tree_w_pos = srcml.code_to_xml(os.path.join(dir_path, self.original_filename), True)
-        orig_tree_w_pos_parent_dict, _ = srcml.get_parent_dict_and_stmt(orig_tree_w_pos)
-        orig_tree_wo_pos, orig_wopos_to_pos_mapping = srcml.copy_tree(orig_tree_w_pos)
-        orig_pos_to_wopos_mapping = dict(
-            zip(
-                list(map(lambda x: x[1], orig_wopos_to_pos_mapping.items())),
-                list(map(lambda x: x[0], orig_wopos_to_pos_mapping.items())),
-            )
-        )
-        orig_tree_wo_pos_parent_dict, _ = srcml.get_parent_dict_and_stmt(orig_tree_wo_pos)
-        srcml.remove_position(orig_tree_wo_pos, orig_tree_wo_pos_parent_dict)
-        tree_wo_log, wolog_to_log_mapping = srcml.copy_tree(self.tree)
-        wolog_parent_dict, _ = srcml.get_parent_dict_and_stmt(tree_wo_log)
-        srcml.remove_annotation_node(tree_wo_log, wolog_parent_dict)
-        srcml.remove_position(tree_wo_log, wolog_parent_dict)
+        orig_index = srcml.TreeIndex(orig_tree_w_pos)
+        line_col_dict = srcml.get_line_col_dict(orig_tree_w_pos)
+        # Nodes of the tree in the BFS order of the tree w/o ORBS log nodes
+        wolog_node_list = self.index.bfs_nodes_wo_annotation()
 
         log_dict = {}
         for stmt_node in self.stmt_list:
             log_dict[stmt_node] = []
-        node_list = srcml.get_bfs_node_list(self.tree)
-        standalone_log_node_list = list(
-            filter(
-                lambda node: srcml.is_stmt_tag(node.tag)
-                and srcml.is_standalone_ORBS_log_node(node),
-                node_list,
-            )
-        )
-        ternary_log_node_list = list(
-            filter(
-                lambda node: srcml.is_expr_tag(node.tag) and srcml.is_ternary_ORBS_log_node(node),
-                node_list,
-            )
-        )
+        standalone_log_node_list = self.index.bfs_nodes(self.index.log)
+        ternary_log_node_list = self.index.bfs_nodes(self.index.ternary_log)
 
         for log_node in standalone_log_node_list:
             line, col = srcml.get_criteria_line_col(log_node)
-            var_node = srcml.get_node_by_line_col(orig_tree_w_pos, line, col)
-            stmt_node = srcml.get_parent_stmt_node(var_node, orig_tree_w_pos_parent_dict)
-            stmt_node_in_wo_pos_tree = orig_pos_to_wopos_mapping[stmt_node]
-            stmt_node_index = srcml.get_node_index_in_tree(
-                orig_tree_wo_pos, stmt_node_in_wo_pos_tree
-            )
-            stmt_node_in_wo_log_tree = srcml.get_node_by_index(tree_wo_log, stmt_node_index)
-            stmt_node_in_tree = wolog_to_log_mapping[stmt_node_in_wo_log_tree]
-            log_dict[stmt_node_in_tree].append(log_node)
+            var_node = line_col_dict.get((line, col))
+            stmt_node = orig_index.get_parent_stmt_node(var_node)
+            # BFS index of the stmt node in the original tree w/o position
+            stmt_node_index = orig_index.bfs_index(stmt_node)
+            log_dict[wolog_node_list[stmt_node_index]].append(log_node)
         for log_node in ternary_log_node_list:
-            stmt_node = srcml.get_parent_stmt_node(log_node, self.parent_dict)
+            stmt_node = self.index.get_parent_stmt_node(log_node)
             log_dict[stmt_node].append(log_node)
         return log_dict
 
@@ -128,6 +105,10 @@ Diff:\n{}".format(
                 )
             )
 
+    def save_artifacts(self, srcml_data_path):
+        self.save_unit(srcml_data_path)
+        self.save_left(srcml_data_path)
+
     def save_unit(self, srcml_data_path):
         srcml_unit_path = os.path.join(srcml_data_path, "unit")
         srcml_xml_path = os.path.join(srcml_unit_path, "xml")
@@ -135,20 +116,24 @@ Diff:\n{}".format(
         os.makedirs(srcml_xml_path, exist_ok=True)
         os.makedirs(srcml_src_path, exist_ok=True)
         for idx, stmt_node in enumerate(self.stmt_list):
-            stmt_with_log_node = srcml.get_stmt_with_log_node(stmt_node, self.log_dict[stmt_node])
+            stmt_with_log_node = srcml.get_stmt_with_log_node(
+                stmt_node, self.log_dict[stmt_node], self.position_dict
+            )
             tree = ET.ElementTree(stmt_with_log_node)
             copy_tree, mapping = srcml.copy_tree(tree)
-            copy_parent_dict, _ = srcml.get_parent_dict_and_stmt(copy_tree)
-            # For better representation
             if copy_tree.getroot().tag == "blank":
+                start_pos = self.position_dict[stmt_with_log_node[0]][0]
+                end_pos = self.position_dict[stmt_with_log_node[-1]][1]
+                # For better representation
                 copy_tree.getroot()[-1].tail = None
+            else:
+                start_pos, end_pos = self.position_dict[stmt_node]
 
             src_path = os.path.join(
                 srcml_src_path,
                 self.filename + "_{}".format(idx) + "." + self.filename.split(".")[-1],
             )
             os.makedirs(os.path.dirname(src_path), exist_ok=True)
-            start_pos, end_pos = srcml.get_position(copy_tree.getroot())
             with open(src_path, "w") as f:
                 f.write(
                     "// {} stmt: [{}:{} - {}:{}]\n".format(
@@ -166,7 +151,7 @@ Diff:\n{}".format(
                 f.write(code)
                 for log_node in self.log_dict[stmt_node]:
                     f.write("\n".encode())
-                    start_pos, end_pos = srcml.get_position(log_node)
+                    start_pos, end_pos = self.position_dict[log_node]
                     f.write(
                         "// log: [{}:{} - {}:{}] ".format(
                             start_pos["line"],
@@ -177,7 +162,6 @@ Diff:\n{}".format(
                     )
                     f.write(srcml.node_to_code(log_node))
 
-            srcml.remove_position(copy_tree, copy_parent_dict)
             xml_path = os.path.join(srcml_xml_path, self.filename + "_{}".format(idx) + ".xml")
             os.makedirs(os.path.dirname(xml_path), exist_ok=True)
             copy_tree.write(xml_path)
@@ -190,7 +174,7 @@ Diff:\n{}".format(
         os.makedirs(srcml_src_path, exist_ok=True)
         for i in range(len(self.stmt_list)):
             one_deleted = [False] * i + [True] + [False] * ((len(self.stmt_list)) - i - 1)
-            tree = self.create_SrcMLTree(one_deleted).tree
+            tree = self.get_sliced_tree(one_deleted)
             xml_path = os.path.join(srcml_xml_path, self.filename + "_{}".format(i) + ".xml")
             os.makedirs(os.path.dirname(xml_path), exist_ok=True)
             tree.write(xml_path)
@@ -204,17 +188,53 @@ Diff:\n{}".format(
             with open(src_path, "wb") as f:
                 f.write(code)
 
-    def create_SrcMLTree(self, deleted_list: [bool]):
+    def render(self, deleted_list: [bool]) -> bytes:
+        """
+        Code of the tree without the deleted statements (and their ORBS log
+        nodes), emitted through the deletion overlay: the tree is neither
+        copied nor mutated.
+        """
+        removed, text, tail = self.get_overlay(deleted_list)
+        code = "".join(srcml.iter_overlay_code(self.tree.getroot(), removed, text, tail))
+        return code.encode("utf-8")
+
+    def get_sliced_tree(self, deleted_list: [bool]) -> ET:
+        """
+        Copy of the tree without the deleted statements (and their ORBS log
+        nodes); only the kept nodes are copied, through the deletion overlay.
+        """
+        removed, text, tail = self.get_overlay(deleted_list)
+        return ET.ElementTree(srcml.copy_overlay(self.tree.getroot(), removed, text, tail))
+
+    def get_overlay(self, deleted_list: [bool]) -> (set, dict, dict):
+        """
+        Overlay (srcml.delete_node_overlay) of the deletion of the statements
+        """
         assert len(deleted_list) == len(self.stmt_list)
-        rep_SrcMLTree = copy.deepcopy(self)
+        removed, text, tail = set(), {}, {}
         for idx, deleted in enumerate(deleted_list):
             if deleted:
-                child_node = rep_SrcMLTree.stmt_list[idx]
-                parent_node = rep_SrcMLTree.parent_dict[child_node]
-                srcml.delete_node(parent_node, child_node)
-                for log_node in rep_SrcMLTree.log_dict[child_node]:
-                    srcml.delete_node(rep_SrcMLTree.parent_dict[log_node], log_node)
-        return rep_SrcMLTree
+                child_node = self.stmt_list[idx]
+                for node in [child_node] + self.log_dict[child_node]:
+                    parent_node = self.index.parent_of(node)
+                    # Deletion inside a deleted subtree does not change the code
+                    if not self.is_detached(parent_node, removed):
+                        srcml.delete_node_overlay(parent_node, node, removed, text, tail)
+        return removed, text, tail
+
+    def is_detached(self, node: ET.Element, removed: set) -> bool:
+        """
+        Whether the node or one of its ancestors has been removed
+        """
+        while node is not None:
+            if node in removed:
+                return True
+            node = self.index.parent_of(node)
+        return False
+
+
+def _build_tree(args):
+    return SrcMLTree(*args)
 
 
 class SrcMLFactorManager(FactorManager):
@@ -230,20 +250,170 @@ class SrcMLFactorManager(FactorManager):
     def size(self):
         return self._size
 
-    def __init__(self, project_name, program_space):
+    # Bump when SrcMLTree changes, to invalidate the parse cache
+    PARSE_CACHE_VERSION = 2
+
+    def __init__(self, project_name, program_space, parse_cache=True, unit_artifacts="sync"):
         super().__init__(program_space)
+        if unit_artifacts not in ["sync", "background", "skip"]:
+            raise Exception("Invalid unit_artifacts({})".format(unit_artifacts))
 
         self._factor = []
-        for filename in self._program_space.files:
-            srcMLTree = SrcMLTree(self._program_space.orig_dir, filename, project_name)
+        self._digests = [self.get_source_digest(filename) for filename in program_space.files]
+        for filename, srcMLTree in self.load_trees(project_name, parse_cache).items():
             self._tree_dict[filename] = srcMLTree
             self._factor += list(zip([filename] * len(srcMLTree.stmt_list), srcMLTree.stmt_list))
         self._size = len(self._factor)
+        self._init_stmt_relation()
+        self._artifact_process = None
+        self.update_unit_artifacts(project_name, unit_artifacts)
 
         # Debug
         root_logger.debug("self._size = {}".format(self._size))
         root_logger.debug("self._factor[0] = {}".format(self._factor[0]))
 
+    def get_source_digest(self, filename: str) -> str:
+        """
+        Digest of the source file and its original (w/o ORBS log) file
+        """
+        digest = hashlib.sha256(str(self.PARSE_CACHE_VERSION).encode())
+        original_filename = (
+            ".".join(filename.split(".")[:-1]) + "_original." + filename.split(".")[-1]
+        )
+        for name in [filename, original_filename]:
+            digest.update(name.encode())
+            with open(os.path.join(self._program_space.orig_dir, name), "rb") as f:
+                digest.update(f.read())
+        return digest.hexdigest()
+
+    def load_trees(self, project_name: str, parse_cache: bool) -> {str: SrcMLTree}:
+        """
+        Load the srcML trees of the files from the parse cache
+        (output/cache/<project>/srcml), keyed by the digest of the sources.
+        The files missing from the cache are parsed again, in parallel.
+        """
+        files = self._program_space.files
+        cache_dir = os.path.join("output", "cache", project_name, "srcml")
+        tree_dict = {}
+        missing = []
+        for filename, digest in zip(files, self._digests):
+            cache_path = os.path.join(cache_dir, filename + ".pickle")
+            if parse_cache and os.path.exists(cache_path):
+                try:
+                    with open(cache_path, "rb") as f:
+                        cached_digest, srcMLTree = pickle.load(f)
+                except Exception as e:
+                    # A corrupt entry is parsed again and overwritten
+                    root_logger.warning("Parse cache: {} unreadable ({})".format(cache_path, e))
+                    cached_digest = None
+                if cached_digest == digest:
+                    tree_dict[filename] = srcMLTree
+                    continue
+            missing.append(filename)
+        root_logger.info(
+            "Parse cache: {} hit, {} miss ({})".format(len(tree_dict), len(missing), cache_dir)
+        )
+
+        args_list = [
+            (self._program_space.orig_dir, filename, project_name, False) for filename in missing
+        ]
+        if len(missing) > 1:
+            with multiprocessing.Pool(min(len(missing), os.cpu_count() or 1)) as pool:
+                tree_dict.update(zip(missing, pool.map(_build_tree, args_list)))
+        else:
+            tree_dict.update(zip(missing, map(_build_tree, args_list)))
+
+        for filename, digest in zip(files, self._digests):
+            if filename not in missing:
+                continue
+            cache_path = os.path.join(cache_dir, filename + ".pickle")
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            # A temporary file per process: concurrent runs replace the entry atomically
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump((digest, tree_dict[filename]), f, pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, cache_path)
+        return {filename: tree_dict[filename] for filename in files}
+
+    def update_unit_artifacts(self, project_name: str, unit_artifacts: str):
+        """
+        Regenerate the unit artifacts (output/unit/<project>) unless they
+        have been generated from the same sources.
+        sync: before the experiments, background: on a background process,
+        skip: not at all (the stale artifacts are removed).
+        """
+        srcml_data_path = os.path.join("output", "unit", project_name)
+        stamp_path = os.path.join(srcml_data_path, "digest")
+        stamp = hashlib.sha256("".join(self._digests).encode()).hexdigest()
+        if os.path.exists(stamp_path):
+            with open(stamp_path) as f:
+                if f.read() == stamp:
+                    return
+        if unit_artifacts == "sync":
+            self.save_unit_artifacts(srcml_data_path, stamp)
+        elif unit_artifacts == "background":
+            # fork: the process shares the trees; it is joined by close()
+            context = multiprocessing.get_context("fork")
+            self._artifact_process = context.Process(
+                target=self.save_unit_artifacts, args=(srcml_data_path, stamp)
+            )
+            self._artifact_process.start()
+        else:
+            self.remove_unit_artifacts(srcml_data_path)
+            root_logger.info("Unit artifacts skipped: {}".format(srcml_data_path))
+
+    def save_unit_artifacts(self, srcml_data_path: str, stamp: str):
+        """
+        Save the artifacts in a temporary directory, renamed in place once
+        complete, so that concurrent runs never write in the same directory
+        """
+        parent_path = os.path.dirname(srcml_data_path)
+        os.makedirs(parent_path, exist_ok=True)
+        temp_path = tempfile.mkdtemp(
+            dir=parent_path, prefix="." + os.path.basename(srcml_data_path) + "."
+        )
+        for filename in self._program_space.files:
+            self._tree_dict[filename].save_artifacts(temp_path)
+        # Written last: the artifacts are complete
+        with open(os.path.join(temp_path, "digest"), "w") as f:
+            f.write(stamp)
+        self.remove_unit_artifacts(srcml_data_path)
+        try:
+            os.rename(temp_path, srcml_data_path)
+        except OSError:
+            # Renamed in place by a concurrent run in the meantime
+            shutil.rmtree(temp_path)
+        root_logger.info("Unit artifacts saved: {}".format(srcml_data_path))
+
+    @staticmethod
+    def remove_unit_artifacts(srcml_data_path: str):
+        """
+        Move the artifacts away before removing them, so that a concurrent run
+        never sees a partially removed directory
+        """
+        parent_path = os.path.dirname(srcml_data_path)
+        if not os.path.exists(srcml_data_path):
+            return
+        stale_path = tempfile.mkdtemp(
+            dir=parent_path, prefix="." + os.path.basename(srcml_data_path) + "."
+        )
+        try:
+            os.rename(srcml_data_path, os.path.join(stale_path, "stale"))
+        except FileNotFoundError:
+            # Removed by a concurrent run in the meantime
+            pass
+        shutil.rmtree(stale_path)
+
+    def close(self):
+        if self._artifact_process is None:
+            return
+        self._artifact_process.join()
+        if self._artifact_process.exitcode != 0:
+            root_logger.error(
+                "Unit artifacts failed (exit code: {})".format(self._artifact_process.exitcode)
+            )
+        self._artifact_process = None
+
     def get_file_scope(self, filename: str, attempt: [bool]) -> [bool]:
         """
         return the sublist of attempt list for specific file (filename)
@@ -270,13 +440,12 @@ class SrcMLFactorManager(FactorManager):
         """
         return self._factor.index((filename, stmt_node))
 
-    def create_program(self, factor, iter_cnt, save_flag, only_code=False):
-        work_dir = super().create_program(factor, iter_cnt, save_flag, only_code)
+    def create_program(self, factor, iter_cnt, save_flag, only_code=False, work_name="work"):
+        work_dir = super().create_program(factor, iter_cnt, save_flag, only_code, work_name)
 
         for filename in self._program_space.files:
             tree = self.tree_dict[filename]
-            sliced_tree = tree.create_SrcMLTree(self.get_file_scope(filename, factor))
-            code = srcml.xml_to_code(sliced_tree.tree)
+            code = tree.render(self.get_file_scope(filename, factor))
             filepath = os.path.join(work_dir, filename)
             with open(filepath, "wb") as f:
                 f.write(code)
@@ -284,28 +453,107 @@ class SrcMLFactorManager(FactorManager):
 
         return work_dir
 
+    def _init_stmt_relation(self):
+        """
+        Precompute the statement containment relation and the statements that
+        can not be deleted (decl, init, return).
+        The stmt nodes contained in a stmt node are contiguous in preorder, so
+        the containment is kept as an interval of preorder ranks:
+        self._stmt_preorder[rank] is the factor index of the rank-th stmt node,
+        and the stmt node of rank r contains the ranks [r, self._stmt_end[r]).
+        """
+        preorder, end = [], []
+        offset = 0
+        for filename in self._program_space.files:
+            index = self._tree_dict[filename].index
+            # Preorder node index of the stmt nodes, in preorder and in factor order
+            stmt_nodes = np.flatnonzero(index.stmt)
+            factor_nodes = index.bfs[index.stmt[index.bfs]]
+            factor_idx = np.empty(len(index), dtype=np.int64)
+            factor_idx[factor_nodes] = offset + np.arange(len(factor_nodes))
+            # Number of the stmt nodes before each node in preorder
+            stmt_cum = np.concatenate(([0], np.cumsum(index.stmt)))
+            preorder.append(factor_idx[stmt_nodes])
+            end.append(offset + stmt_cum[index.end[stmt_nodes]])
+            offset += len(stmt_nodes)
+        self._stmt_preorder = np.concatenate(preorder)
+        self._stmt_rank = np.empty(self._size, dtype=np.int64)
+        self._stmt_rank[self._stmt_preorder] = np.arange(self._size)
+        self._stmt_end = np.concatenate(end).astype(np.int64)
+        self._invalid_stmt = np.array(
+            [
+                srcml.is_decl_node(stmt_node)
+                or srcml.is_init_node(stmt_node)
+                or srcml.is_ret_node(stmt_node)
+                for _, stmt_node in self._factor
+            ],
+            dtype=bool,
+        )
+
     def revise_factor(self, factor):
-        revised_factor = list(factor)
-        deletion_factor = [self._factor[i] for i in range(self._size) if factor[i] == 1]
+        return self.revise_factors([factor])[0].tolist()
+
+    def revise_factors(self, factors):
+        """
+        Delete every stmt node contained in a deleted stmt node
+        :param factors: 2-D array of factors
+        :return: 2-D array of revised factors
+        """
+        factors = np.asarray(factors, dtype=bool)
+        row_cnt = len(factors)
+        rows, ranks = np.nonzero(factors[:, self._stmt_preorder])
+        # +1 at the start and -1 at the end of the deleted intervals
+        width = self._size + 1
+        diff = np.bincount(rows * width + ranks, minlength=row_cnt * width) - np.bincount(
+            rows * width + self._stmt_end[ranks], minlength=row_cnt * width
+        )
+        deleted = np.cumsum(diff.reshape(row_cnt, width), axis=1)[:, :-1] > 0
+        return deleted[:, self._stmt_rank].astype(np.int8)
 
-        for filename, stmt_node in deletion_factor:
-            srcMLTree = self.tree_dict[filename]
-            for child in stmt_node.iter():
-                if child in srcMLTree.stmt_list:
-                    revised_factor[self.get_slice_position(filename, child)] = 1
-        return revised_factor
+    def deletable_factors(self, factors):
+        """
+        Revise the factors, and keep the decl, init and return stmt nodes they
+        delete, along with the stmt nodes containing them: the rows delete the
+        deletable stmt nodes of their subtrees
+        :param factors: 2-D array of factors
+        :return: 2-D array of valid revised factors
+        """
+        # Deleted and kept stmt nodes, by preorder rank
+        deleted = self.revise_factors(factors).astype(bool)[:, self._stmt_preorder]
+        kept = deleted & self._invalid_stmt[self._stmt_preorder]
+        # Number of the kept stmt nodes before each rank, to count them in the subtrees
+        kept_cum = np.zeros((len(deleted), self._size + 1), dtype=np.int64)
+        np.cumsum(kept, axis=1, out=kept_cum[:, 1:])
+        contains_kept = kept_cum[:, self._stmt_end] > kept_cum[:, 1:]
+        deleted &= ~(kept | contains_kept)
+        return deleted[:, self._stmt_rank].astype(np.int8)
+
+    def get_child_factors(self, factor_idx=None) -> [int]:
+        """
+        Factors of the stmt nodes directly contained in the stmt node of the
+        factor, or of the outermost stmt nodes (functions, ...) if factor_idx is
+        None, in preorder
+        """
+        if factor_idx is None:
+            rank, stop = 0, self._size
+        else:
+            rank = self._stmt_rank[factor_idx]
+            rank, stop = rank + 1, self._stmt_end[rank]
+        child_factors = []
+        while rank < stop:
+            child_factors.append(int(self._stmt_preorder[rank]))
+            rank = self._stmt_end[rank]
+        return child_factors
 
     def is_valid_factor(self, factor) -> bool:
         """
         if factor deletes decl or initialization or return statement, return false
         """
-        deletion_factor = [self._factor[i] for i in range(self._size) if factor[i] == 1]
+        return bool(self.valid_factors([factor])[0])
 
-        for filename, stmt_node in deletion_factor:
-            if (
-                srcml.is_decl_node(stmt_node)
-                or srcml.is_init_node(stmt_node)
-                or srcml.is_ret_node(stmt_node)
-            ):
-                return False
-        return True
+    def valid_factors(self, factors):
+        """
+        is_valid_factor on every row of the 2-D array of factors
+        """
+        factors = np.asarray(factors, dtype=bool)
+        return np.logical_not(np.any(factors & self._invalid_stmt, axis=1))
@@ -0,0 +1,59 @@
+import logging
+import numpy as np
+
+root_logger = logging.getLogger()
+
+
+def get_response_idx_list(num_test, num_crit, crit_idx) -> np.ndarray:
+    """
+    Responses of the tests of the criterion (the first response is the compilation)
+    """
+    return np.array(range(num_test)) * num_crit + crit_idx + 1
+
+
+def getXy(sample_data, factor_size, test_idx_list) -> (np.ndarray, np.ndarray):
+    return (
+        sample_data[:, :factor_size],
+        np.bitwise_and.reduce(sample_data[:, test_idx_list], 1),
+    )
+
+
+def get_factor_once_success(sample_data, factor_size, test_idx_list) -> np.ndarray:
+    test_succ_row_list = list(
+        filter(lambda row: np.bitwise_and.reduce(row[test_idx_list], 0), sample_data)
+    )
+    if len(test_succ_row_list) == 0:
+        return np.array([False] * factor_size)
+    else:
+        return np.bitwise_or.reduce(test_succ_row_list, 0)[:factor_size]
+
+
+def get_factor_counts(X, y) -> (np.ndarray, np.ndarray):
+    """
+    count(Response=1 && Factor=1) and count(Factor=1) of every factor
+    """
+    X = np.asarray(X, dtype=bool)
+    y = np.asarray(y, dtype=bool)
+    return np.count_nonzero(X[y], axis=0), np.count_nonzero(X, axis=0)
+
+
+# p(Response=1|Factor=1) = p(Response=1 && Factor=1) / p(Factor=1)
+def get_factor_individual_bayesian(sample_data, factor_size, test_idx_list) -> np.ndarray:
+    X, y = getXy(sample_data, factor_size, test_idx_list)
+    count_factor_1_response_1, count_factor_1 = get_factor_counts(X, y)
+    factor_prop = count_factor_1_response_1 / count_factor_1
+    root_logger.debug(", ".join(list(map(lambda x: "{:.2f}".format(x), factor_prop))))
+    return factor_prop > np.mean(factor_prop)
+
+
+def get_factor_posterior(X, y, prior=1.0) -> (np.ndarray, np.ndarray):
+    """
+    Mean and variance of p(Response=1|Factor=1) of every factor, with the
+    Beta(prior, prior) prior (defined for the factors never deleted too)
+    """
+    count_factor_1_response_1, count_factor_1 = get_factor_counts(X, y)
+    alpha = count_factor_1_response_1 + prior
+    beta = count_factor_1 - count_factor_1_response_1 + prior
+    mean = alpha / (alpha + beta)
+    variance = mean * (1 - mean) / (alpha + beta + 1)
+    return mean, variance
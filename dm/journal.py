@@ -0,0 +1,119 @@
+import os
+import zlib
+import struct
+import logging
+import numpy as np
+
+root_logger = logging.getLogger()
+
+# File: JOURNAL_MAGIC, factor size and response size (uint32, little endian),
+# then the records: payload size and crc32 of the payload (uint32, little
+# endian), and the payload: iteration count (int64), packed factor and
+# packed response.
+JOURNAL_MAGIC = b"MOADJRNL"
+FILE_HEADER = struct.Struct("<II")
+RECORD_HEADER = struct.Struct("<II")
+ITER_CNT = struct.Struct("<q")
+
+
+class Journal:
+    """
+    Append-only journal of the observations, written as the experiments
+    finish, so that an interrupted run can be resumed.
+
+    Every record is flushed to the OS when appended, and the file is synced
+    to the disk every sync_every records (and when the journal is closed).
+    """
+
+    def __init__(self, path, factor_size, response_size, sync_every=64):
+        self._path = path
+        self._factor_size = factor_size
+        self._response_size = response_size
+        self._factor_bytes = (factor_size + 7) // 8
+        self._response_bytes = (response_size + 7) // 8
+        self._sync_every = sync_every
+        self._unsynced = 0
+        self._file = None
+
+    @property
+    def path(self):
+        return self._path
+
+    def replay(self):
+        """
+        Yield the (iteration count, factor, response) of the records.
+        A torn or corrupted tail (e.g. after a crash while writing) is cut off.
+        """
+        if not os.path.exists(self._path):
+            return
+        payload_size = ITER_CNT.size + self._factor_bytes + self._response_bytes
+        with open(self._path, "rb") as f:
+            if f.read(len(JOURNAL_MAGIC)) != JOURNAL_MAGIC:
+                raise Exception("Invalid journal({})".format(self._path))
+            sizes = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+            if sizes != (self._factor_size, self._response_size):
+                raise Exception(
+                    "Journal sizes(factor, response: {}) differ from the current ones({})".format(
+                        sizes, (self._factor_size, self._response_size)
+                    )
+                )
+            valid_size = f.tell()
+            while True:
+                record_header = f.read(RECORD_HEADER.size)
+                if not record_header:
+                    break
+                if len(record_header) < RECORD_HEADER.size:
+                    root_logger.warning("Journal: torn record at {}".format(valid_size))
+                    break
+                size, crc = RECORD_HEADER.unpack(record_header)
+                payload = f.read(size)
+                if size != payload_size or len(payload) < size or zlib.crc32(payload) != crc:
+                    root_logger.warning("Journal: invalid record at {}".format(valid_size))
+                    break
+                valid_size = f.tell()
+                (iter_cnt,) = ITER_CNT.unpack_from(payload)
+                bits = np.frombuffer(payload, dtype=np.uint8, offset=ITER_CNT.size)
+                factor = np.unpackbits(bits[: self._factor_bytes], count=self._factor_size)
+                response = np.unpackbits(bits[self._factor_bytes :], count=self._response_size)
+                yield iter_cnt, factor.tolist(), response.astype(bool).tolist()
+        if valid_size < os.path.getsize(self._path):
+            os.truncate(self._path, valid_size)
+
+    def append(self, iter_cnt, factor, response):
+        if self._file is None:
+            exists = os.path.exists(self._path)
+            self._file = open(self._path, "ab")
+            if not exists:
+                self._file.write(JOURNAL_MAGIC)
+                self._file.write(FILE_HEADER.pack(self._factor_size, self._response_size))
+        payload = (
+            ITER_CNT.pack(iter_cnt)
+            + np.packbits(np.asarray(factor, dtype=bool)).tobytes()
+            + np.packbits(np.asarray(response, dtype=bool)).tobytes()
+        )
+        self._file.write(RECORD_HEADER.pack(len(payload), zlib.crc32(payload)))
+        self._file.write(payload)
+        self._file.flush()
+        self._unsynced += 1
+        if self._unsynced >= self._sync_every:
+            self.sync()
+
+    def sync(self):
+        if self._file is not None and self._unsynced:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+
+    def close(self):
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        """
+        Remove the journal once the run is complete, so that the same command
+        starts a new run instead of resuming the completed one
+        """
+        self.close()
+        if os.path.exists(self._path):
+            os.remove(self._path)
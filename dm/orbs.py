@@ -0,0 +1,213 @@
+import collections
+import logging
+import multiprocessing
+import time
+import numpy as np
+from .executor import _init_worker, _run_experiment
+from .inference import get_response_idx_list
+
+root_logger = logging.getLogger()
+
+
+def get_source_order(factor_manager) -> [int]:
+    """
+    Factors in source order: preorder of the nesting of the factors
+    """
+    order = []
+    stack = list(reversed(factor_manager.get_child_factors()))
+    while stack:
+        factor_idx = stack.pop()
+        order.append(factor_idx)
+        stack.extend(reversed(factor_manager.get_child_factors(factor_idx)))
+    return order
+
+
+class OrbsSlicer:
+    """
+    ORBS (observation-based slicing): in source order, delete a window of
+    1 to window factors left in the slice, and keep the deletion when the
+    program compiles and the trajectories of the criteria are unchanged;
+    a larger window is tried only when the deletion does not compile. Passes
+    over the slice are repeated until a pass deletes nothing.
+
+    With jobs > 1, the next jobs candidates are tested in parallel, as if the
+    ones before them failed: the results are decided in the sequential order,
+    the earliest success is committed, and the candidates tested against the
+    former slice are dropped. The slice is the one of the sequential ORBS.
+    A candidate is (version of the slice, pass, position in the slice, width).
+    """
+
+    def __init__(
+        self,
+        factor_manager,
+        response_manager,
+        window=3,
+        crit_idx_list=None,
+        save_generated=False,
+        save_log=False,
+        jobs=1,
+    ):
+        if window <= 0:
+            raise Exception("Invalid window({})".format(window))
+        if jobs <= 0:
+            raise Exception("Invalid jobs({})".format(jobs))
+        self._factor_manager = factor_manager
+        self._response_manager = response_manager
+        self._window = window
+        self._save_generated = save_generated
+        self._save_log = save_log
+        self._jobs = jobs
+        if crit_idx_list is None:
+            crit_idx_list = range(response_manager.num_crit)
+        # The compilation and the tests of the criteria
+        self._response_idx_list = np.concatenate(
+            [[0]]
+            + [
+                get_response_idx_list(response_manager.num_test, response_manager.num_crit, idx)
+                for idx in crit_idx_list
+            ]
+        )
+        self._order = np.array(get_source_order(factor_manager), dtype=np.int64)
+        self._deleted = np.zeros(factor_manager.size, dtype=bool)
+        self._left = self._order
+        self._version = 0
+        self._pass_deleted = False
+        self.run_cnt = 0
+        self.wasted_cnt = 0
+        self.pass_cnt = 1
+
+    @property
+    def deleted(self) -> np.ndarray:
+        """
+        Factors deleted by the slice
+        """
+        return self._deleted
+
+    def run(self) -> np.ndarray:
+        start = time.perf_counter()
+        if self._jobs == 1:
+            self._slice(None)
+        else:
+            # fork: workers inherit the (possibly unpicklable) factor manager
+            context = multiprocessing.get_context("fork")
+            slot_queue = context.Queue()
+            for slot in range(self._jobs):
+                slot_queue.put(slot)
+            initargs = (
+                self._factor_manager,
+                self._response_manager,
+                self._save_generated,
+                self._save_log,
+                slot_queue,
+            )
+            with context.Pool(self._jobs, _init_worker, initargs) as pool:
+                self._slice(pool)
+        root_logger.info(
+            "ORBS: {} of {} factors deleted, {} passes, {} runs ({} speculative runs wasted), "
+            "{:.2f}s".format(
+                int(self._deleted.sum()),
+                len(self._deleted),
+                self.pass_cnt,
+                self.run_cnt,
+                self.wasted_cnt,
+                time.perf_counter() - start,
+            )
+        )
+        return self._deleted
+
+    def _slice(self, pool):
+        expected = self._wrap(self._version, 0, 0, False)
+        issued = expected
+        in_flight = collections.deque()
+        while expected is not None:
+            while issued is not None and len(in_flight) < self._jobs:
+                factor = self._get_factor(issued)
+                in_flight.append((issued, factor, self._submit(pool, factor)))
+                # Speculate that the candidate does not compile
+                issued = self._get_next_candidate(
+                    issued, False, self._pass_deleted and issued[1] == expected[1]
+                )
+            candidate, factor, result = in_flight.popleft()
+            response = self._collect(pool, result)
+            if candidate != expected:
+                self.wasted_cnt += factor is not None
+                continue
+            compiled = response is not None and bool(response[0])
+            if compiled and np.all(response[self._response_idx_list]):
+                self._commit(factor)
+                # The factors after the window move to its position
+                expected = self._wrap(self._version, candidate[1], candidate[2], True)
+                issued = expected
+            else:
+                expected = self._get_next_candidate(candidate, compiled, self._pass_deleted)
+                if compiled and issued is not None and issued[:3] == candidate[:3]:
+                    # The larger windows are not tried
+                    issued = expected
+            if expected is not None and expected[1] != candidate[1]:
+                self.pass_cnt += 1
+                self._pass_deleted = False
+            if issued is None and not in_flight:
+                issued = expected
+
+    def _get_next_candidate(self, candidate, compiled, pass_deleted):
+        """
+        Candidate after the one which failed: a larger window if it did not
+        compile, or else the next position
+        """
+        version, pass_idx, pos, width = candidate
+        if not compiled and width < self._window and pos + width < len(self._left):
+            return version, pass_idx, pos, width + 1
+        return self._wrap(version, pass_idx, pos + 1, pass_deleted)
+
+    def _wrap(self, version, pass_idx, pos, pass_deleted):
+        """
+        Candidate of the smallest window at the position, or at the start of
+        the next pass after the end of a pass which deleted factors (None after
+        the end of a pass which deleted nothing)
+        """
+        if pos < len(self._left):
+            return version, pass_idx, pos, 1
+        if pass_deleted and len(self._left):
+            return version, pass_idx + 1, 0, 1
+        return None
+
+    def _get_factor(self, candidate):
+        """
+        Revised factor deleting the window of the candidate from the slice, or
+        None if it is invalid
+        """
+        _, _, pos, width = candidate
+        factor = self._deleted.copy()
+        factor[self._left[pos : pos + width]] = True
+        factor = self._factor_manager.revise_factor(factor.astype(int).tolist())
+        if not self._factor_manager.is_valid_factor(factor):
+            return None
+        return factor
+
+    def _submit(self, pool, factor):
+        if factor is None:
+            return None
+        self.run_cnt += 1
+        if pool is None:
+            program_path = self._factor_manager.create_program(
+                factor, self.run_cnt, self._save_generated
+            )
+            return self._response_manager.get_response(program_path, self._save_log)
+        return pool.apply_async(_run_experiment, (self.run_cnt, factor))
+
+    def _collect(self, pool, result):
+        if pool is None or result is None:
+            return None if result is None else np.asarray(result, dtype=bool)
+        response, cache_hits = result.get()
+        # Every worker keeps its own response cache
+        self._response_manager.add_cache_hits(cache_hits)
+        return np.asarray(response, dtype=bool)
+
+    def _commit(self, factor):
+        self._deleted = np.asarray(factor, dtype=bool)
+        self._left = self._order[~self._deleted[self._order]]
+        self._version += 1
+        self._pass_deleted = True
+        root_logger.info(
+            "ORBS: pass {}, {} factors left in the slice".format(self.pass_cnt, len(self._left))
+        )
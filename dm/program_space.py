@@ -32,6 +32,10 @@ class ProgramSpace:
     def files(self):
         return self._files
 
+    @property
+    def script_dir(self):
+        return self._script_dir
+
     @property
     def compile_script(self):
         return os.path.join(self._script_dir, self._compile_script)
@@ -1,26 +1,98 @@
 from .util import run, run_output
+import os
+import hashlib
 import logging
 
 root_logger = logging.getLogger()
 
 
 class ResponseManager:
-    def __init__(self, program_space):
+    def __init__(self, program_space, store=None):
         self._base_work_dir = program_space.base_work_dir
         self._compile_script = program_space.compile_script
         self._execute_script = program_space.execute_script
         self._terminate_script = program_space.terminate_script
         self._num_test = program_space.num_test
         self._num_crit = program_space.num_crit
+        self._files = program_space.files
+
+        # Memo: digest of the generated sources -> response,
+        #       output of the compile script (md5sum of the binary) -> response
+        self._source_memo = {}
+        self._binary_memo = {}
+        self._cache_hits = {"source": 0, "binary": 0, "store": 0}
+        # On-disk response store shared across runs (dm.response_store.ResponseStore)
+        self._store = store
 
         # Debug
         root_logger.debug("self._compile_script = {}".format(self._compile_script))
 
     def get_response(self, program_path, save_log):
+        return self.test(program_path, self.compile(program_path), save_log)
+
+    def get_source_digest(self, program_path):
+        """
+        Digest of the target source files of the program.
+        """
+        digest = hashlib.sha256()
+        for filename in self._files:
+            digest.update(filename.encode())
+            with open(os.path.join(program_path, filename), "rb") as f:
+                digest.update(f.read())
+        return digest.hexdigest()
+
+    def compile(self, program_path):
+        """
+        Compile the program, unless the same sources have been tested already.
+        Return the source digest and the output of the compile script (None on failure).
+        """
+        source_key = self.get_source_digest(program_path)
+        if source_key not in self._source_memo and self._store is not None:
+            response = self._store.get(source_key)
+            if response is not None:
+                self._cache_hits["store"] += 1
+                root_logger.debug("Store hit: {}".format(source_key))
+                self._source_memo[source_key] = response
+        if source_key in self._source_memo:
+            return source_key, None
+        return source_key, run(self._compile_script, program_path)
+
+    def test(self, program_path, compiled, save_log):
+        """
+        Run the test suite on the compiled program and compare the trajectories,
+        unless the same sources or the same binary have been tested already.
+        """
+        source_key, comp_result = compiled
+        source_hit = source_key in self._source_memo
+        if source_hit:
+            self._cache_hits["source"] += 1
+            root_logger.debug("Source cache hit: {}".format(source_key))
+            response = self._source_memo[source_key]
+        else:
+            # The compile script prints the md5sum of the binary
+            binary_key = comp_result.strip() if comp_result else None
+            if binary_key in self._binary_memo:
+                self._cache_hits["binary"] += 1
+                root_logger.debug("Binary cache hit: {}".format(binary_key.decode()))
+                response = self._binary_memo[binary_key]
+            else:
+                response = self.run_test(program_path, comp_result)
+                if binary_key:
+                    self._binary_memo[binary_key] = response
+            self._source_memo[source_key] = response
+            if self._store is not None:
+                self._store.put(source_key, response)
+
+        # Nothing to clean up when the compilation has been skipped
+        if not save_log and not (source_hit and comp_result is None):
+            run(self._terminate_script, program_path)
+
+        return list(response)
+
+    def run_test(self, program_path, comp_result):
         comp_succ = False
         test_succ = []
 
-        comp_result = run(self._compile_script, program_path)
         comp_succ = False if comp_result is None else True
 
         if comp_succ:
@@ -32,11 +104,32 @@ class ResponseManager:
         else:
             test_succ = [False] * self._num_test * self._num_crit
 
-        if not save_log:
-            run(self._terminate_script, program_path)
-
         return [comp_succ] + test_succ
 
+    def pop_cache_hits(self):
+        cache_hits = self._cache_hits
+        self._cache_hits = {"source": 0, "binary": 0, "store": 0}
+        return cache_hits
+
+    def add_cache_hits(self, cache_hits):
+        for key, value in cache_hits.items():
+            self._cache_hits[key] += value
+
+    def log_cache_statistics(self):
+        root_logger.info(
+            "Response cache hits: source {} (from store {}), binary {}".format(
+                self._cache_hits["source"], self._cache_hits["store"], self._cache_hits["binary"]
+            )
+        )
+
+    @property
+    def num_test(self):
+        return self._num_test
+
+    @property
+    def num_crit(self):
+        return self._num_crit
+
     @property
     def size(self):
         return 1 + self._num_test * self._num_crit
@@ -0,0 +1,130 @@
+import os
+import time
+import sqlite3
+import contextlib
+import hashlib
+import logging
+import threading
+
+root_logger = logging.getLogger()
+
+# Inserts between two counts of the responses, for the inserts of the other processes
+COUNT_INTERVAL = 1000
+
+
+class ResponseStore:
+    """
+    On-disk response store shared by every run on the project:
+    (oracle digest, source digest) -> response.
+
+    The oracle digest covers the project directory but the original sources
+    (oracle trajectories, scripts, test inputs, configuration), so the
+    entries are invalidated whenever one of them changes. The store keeps at
+    most max_entries responses and evicts the least recently used ones.
+    A connection is opened for each access, so the store can be used from
+    several processes (and threads) at the same time. The responses are
+    counted once, and again when the inserts of this process reach
+    max_entries or every COUNT_INTERVAL inserts, for the other processes.
+    """
+
+    def __init__(self, program_space, max_entries=100000):
+        self._max_entries = max_entries
+        store_dir = os.path.join("output", "cache", program_space.proj_name)
+        os.makedirs(store_dir, exist_ok=True)
+        self._db_path = os.path.join(store_dir, "response.db")
+        self._oracle_digest = self.get_oracle_digest(program_space)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS response ("
+                "oracle_digest TEXT NOT NULL, "
+                "source_digest TEXT NOT NULL, "
+                "response TEXT NOT NULL, "
+                "last_access REAL NOT NULL, "
+                "PRIMARY KEY (oracle_digest, source_digest))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS lru ON response (last_access)")
+            removed = conn.execute(
+                "DELETE FROM response WHERE oracle_digest != ?", (self._oracle_digest,)
+            ).rowcount
+            (self._size,) = conn.execute("SELECT COUNT(*) FROM response").fetchone()
+        self._insert_cnt = 0
+        self._count_lock = threading.Lock()
+        if removed:
+            root_logger.info("Response store: {} stale responses removed.".format(removed))
+        root_logger.info(
+            "Response store: {} (oracle digest: {})".format(self._db_path, self._oracle_digest)
+        )
+
+    @staticmethod
+    def get_oracle_digest(program_space):
+        """
+        Digest of the project directory but the original sources: the oracle
+        trajectories, the scripts, the test inputs and the configuration.
+        """
+        digest = hashlib.sha256()
+        orig_dir = os.path.normpath(program_space.orig_dir)
+        for dir_path, dir_names, filenames in os.walk(program_space.proj_path):
+            dir_names[:] = sorted(
+                dir_name
+                for dir_name in dir_names
+                if os.path.normpath(os.path.join(dir_path, dir_name)) != orig_dir
+            )
+            for filename in sorted(filenames):
+                file_path = os.path.join(dir_path, filename)
+                digest.update(os.path.relpath(file_path, program_space.proj_path).encode())
+                with open(file_path, "rb") as f:
+                    digest.update(f.read())
+        return digest.hexdigest()
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self._db_path, timeout=60)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, source_digest):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT response FROM response WHERE oracle_digest = ? AND source_digest = ?",
+                (self._oracle_digest, source_digest),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE response SET last_access = ? "
+                "WHERE oracle_digest = ? AND source_digest = ?",
+                (time.time(), self._oracle_digest, source_digest),
+            )
+        return list(map(lambda x: x == "1", row[0]))
+
+    def put(self, source_digest, response):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO response VALUES (?, ?, ?, ?)",
+                (
+                    self._oracle_digest,
+                    source_digest,
+                    "".join(map(lambda x: "1" if x else "0", response)),
+                    time.time(),
+                ),
+            )
+            with self._count_lock:
+                # A replaced response is counted too, until the next count
+                self._size += 1
+                self._insert_cnt += 1
+                if self._size <= self._max_entries and self._insert_cnt < COUNT_INTERVAL:
+                    return
+                (self._size,) = conn.execute("SELECT COUNT(*) FROM response").fetchone()
+                self._insert_cnt = 0
+                if self._size > self._max_entries:
+                    conn.execute(
+                        "DELETE FROM response WHERE rowid IN "
+                        "(SELECT rowid FROM response ORDER BY last_access LIMIT ?)",
+                        (self._size - self._max_entries,),
+                    )
+                    self._size = self._max_entries
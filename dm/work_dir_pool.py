@@ -0,0 +1,99 @@
+import os
+import stat
+import shutil
+import logging
+
+root_logger = logging.getLogger()
+
+
+class WorkDirPool:
+    """
+    Keep the work directories in sync with the original directory without
+    rebuilding them for every experiment.
+
+    Files of the original directory are copied into the work directory once,
+    and the target source files are left to the factor manager, which writes
+    them for every experiment. Only the read-only files are hard-linked
+    (copied when linking is not possible), so that a script modifying a file
+    in place (e.g. by appending to an input file) does not modify the
+    original directory. When a work directory is reused, the files generated
+    by the previous experiment are removed and modified files are copied
+    again, in place.
+    """
+
+    def __init__(self, program_space):
+        self._orig_dir = program_space.orig_dir
+        self._files = set(map(os.path.normpath, program_space.files))
+        # relative path -> stat of the file in orig_dir (target source files excluded)
+        self._manifest = {}
+        self._dirs = set()
+        for dir_path, _, filenames in os.walk(self._orig_dir, followlinks=True):
+            rel_dir = os.path.relpath(dir_path, self._orig_dir)
+            if rel_dir != os.curdir:
+                self._dirs.add(rel_dir)
+            for filename in filenames:
+                rel_path = os.path.normpath(os.path.join(rel_dir, filename))
+                if rel_path not in self._files:
+                    self._manifest[rel_path] = os.stat(os.path.join(dir_path, filename))
+        # Directories of the target source files
+        self._code_dirs = set()
+        for rel_path in self._files:
+            rel_dir = os.path.dirname(rel_path)
+            while rel_dir:
+                self._code_dirs.add(rel_dir)
+                rel_dir = os.path.dirname(rel_dir)
+        self._dirs |= self._code_dirs
+
+    @staticmethod
+    def _is_synced(path, orig_stat):
+        stat = os.lstat(path)
+        return (stat.st_ino, stat.st_dev) == (orig_stat.st_ino, orig_stat.st_dev) or (
+            stat.st_size == orig_stat.st_size and stat.st_mtime_ns == orig_stat.st_mtime_ns
+        )
+
+    def _link(self, rel_path, work_dir):
+        src_path = os.path.join(self._orig_dir, rel_path)
+        dst_path = os.path.join(work_dir, rel_path)
+        if not self._manifest[rel_path].st_mode & (stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH):
+            try:
+                os.link(src_path, dst_path)
+                return
+            except OSError:
+                pass
+        shutil.copy2(src_path, dst_path)
+
+    def sync(self, work_dir, only_code=False, keep=("factor",)):
+        """
+        Make work_dir a copy of the original directory, except for the target
+        source files. With only_code, only the directories of the target
+        source files are kept.
+        """
+        manifest, dirs = ({}, self._code_dirs) if only_code else (self._manifest, self._dirs)
+        if not os.path.isdir(work_dir):
+            os.makedirs(work_dir)
+        # Remove what the previous experiment left behind
+        for dir_path, dir_names, filenames in os.walk(work_dir):
+            rel_dir = os.path.relpath(dir_path, work_dir)
+            for dir_name in list(dir_names):
+                rel_path = os.path.normpath(os.path.join(rel_dir, dir_name))
+                path = os.path.join(dir_path, dir_name)
+                if os.path.islink(path):
+                    os.remove(path)
+                    dir_names.remove(dir_name)
+                elif rel_path not in dirs:
+                    shutil.rmtree(path)
+                    dir_names.remove(dir_name)
+            for filename in filenames:
+                rel_path = os.path.normpath(os.path.join(rel_dir, filename))
+                if rel_path in self._files or rel_path in keep:
+                    continue
+                if rel_path not in manifest or not self._is_synced(
+                    os.path.join(dir_path, filename), manifest[rel_path]
+                ):
+                    os.remove(os.path.join(dir_path, filename))
+        for rel_dir in sorted(dirs):
+            os.makedirs(os.path.join(work_dir, rel_dir), exist_ok=True)
+        for rel_path in manifest:
+            if not os.path.lexists(os.path.join(work_dir, rel_path)):
+                self._link(rel_path, work_dir)
+        return work_dir
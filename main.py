@@ -1,7 +1,11 @@
 from dm.program_space import ProgramSpace
 from dm.factor.factor import get_factor_manager
 from dm.response_manager import ResponseManager
+from dm.response_store import ResponseStore
 from dm.doe.doe import get_doe_manager
+from dm.executor import get_executor
+from dm.journal import Journal
+from dm.convergence import ConvergenceMonitor, get_deletable_mask
 from dm.log import create_root_logger, add_outputpath_log_handler
 import argparse
 import logging
@@ -21,16 +25,61 @@ def get_parser():
         "-d",
         "--doe_strategy",
         help="Design of experiment strategy",
-        choices=["onehot", "random", "nhot", "ff2l", "2hot", "random_1000", "random_2000"],
+        choices=[
+            "onehot",
+            "random",
+            "nhot",
+            "ff2l",
+            "pb",
+            "covering",
+            "adaptive",
+            "ddmin",
+            "hierarchical",
+            "2hot",
+            "random_1000",
+            "random_2000",
+        ],
         default="onehot",
     )
     parser.add_argument(
         "--doe_random_threshold", help="DoE random strategy threshold", type=float, default=0.0
     )
+    parser.add_argument(
+        "--doe_random_stratify",
+        help="Stratify the DoE random strategy by the number of deleted factors",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--covering_strength",
+        help="Strength of the DoE covering strategy (every pair or triple of factors)",
+        type=int,
+        choices=[2, 3],
+        default=2,
+    )
+    parser.add_argument(
+        "--doe_adaptive_batch",
+        help="Number of the factors planned per batch by the DoE adaptive strategy",
+        type=int,
+        default=100,
+    )
     parser.add_argument("--max_n", help="Maximum combination for One2NHotDoE", type=int, default=0)
     parser.add_argument(
         "-i", "--max_expr", help="Maximum number of the experiment", default=100, type=int
     )
+    parser.add_argument(
+        "--stop_window",
+        help="Stop early once the inferred slices of every criterion are unchanged over this "
+        "number of observations (0: run up to max_expr)",
+        type=int,
+        default=0,
+    )
+    parser.add_argument(
+        "--stop_interval",
+        help="Number of observations between two inferences of the slices for --stop_window",
+        type=int,
+        default=20,
+    )
     parser.add_argument(
         "-o", "--output_name", help="Output(model) saving folder name", default=None
     )
@@ -47,6 +96,61 @@ def get_parser():
         nargs=2,
         default=None,
     )
+    parser.add_argument(
+        "-j", "--jobs", help="Number of experiments run in parallel", type=int, default=1
+    )
+    parser.add_argument(
+        "--pipeline",
+        help="Run generate, compile and test phases as pipelined stages",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--queue_size", help="Queue size between the pipeline stages", type=int, default=1
+    )
+    parser.add_argument(
+        "--response_store",
+        help="Share responses across runs through the on-disk response store",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--response_store_size",
+        help="Maximum number of responses kept in the response store",
+        type=int,
+        default=100000,
+    )
+    parser.add_argument(
+        "--no_parse_cache",
+        help="Parse the sources again instead of loading the srcML trees from the parse cache",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--unit_artifacts",
+        help="Generate the srcML unit artifacts before the experiments (sync), "
+        "on a background process (background), or not at all (skip)",
+        choices=["sync", "background", "skip"],
+        default="sync",
+    )
+    parser.add_argument(
+        "--data_format",
+        help="Format of the plan and observation files: CSV (csv) or packed bits (bits)",
+        choices=["csv", "bits"],
+        default="csv",
+    )
+    parser.add_argument(
+        "--journal_sync",
+        help="Number of observations journaled between two syncs to the disk",
+        type=int,
+        default=64,
+    )
+    parser.add_argument(
+        "--restart",
+        help="Discard the journal of the previous run instead of resuming it",
+        action="store_true",
+        default=False,
+    )
     return parser
 
 
@@ -57,13 +161,39 @@ def main(args):
         "output", "experiment", args.proj_name, args.output_name
     )
     add_outputpath_log_handler(program_space.base_work_dir, root_logger)
-    factor_manager = get_factor_manager(args.factor_level, args.proj_name, program_space)
-    response_manager = ResponseManager(program_space)
+    factor_manager = get_factor_manager(
+        args.factor_level,
+        args.proj_name,
+        program_space,
+        not args.no_parse_cache,
+        args.unit_artifacts,
+    )
+    if args.response_store:
+        response_store = ResponseStore(program_space, args.response_store_size)
+    else:
+        response_store = None
+    response_manager = ResponseManager(program_space, response_store)
     if args.planned_idx is None:
+        journal_path = os.path.join(program_space.base_work_dir, "journal.bin")
+    else:
+        journal_path = os.path.join(
+            program_space.base_work_dir, "journal_{}_{}.bin".format(*args.planned_idx)
+        )
+    if args.restart and os.path.exists(journal_path):
+        os.remove(journal_path)
+    resume = os.path.exists(journal_path)
+    if args.planned_idx is None and resume:
+        # The plan has been saved before the first experiment
+        plan_path = os.path.join(program_space.base_work_dir, "plan." + args.data_format)
+        assert os.path.exists(plan_path)
+        root_logger.info("Resume from the journal and the saved plan.")
+        expr_idx_range = "all"
+        iter_cnt = 0
+    elif args.planned_idx is None:
         plan_path, expr_idx_range = (None, None)
         iter_cnt = 0
     else:
-        plan_path = os.path.join(program_space.base_work_dir, "plan.csv")
+        plan_path = os.path.join(program_space.base_work_dir, "plan." + args.data_format)
         assert os.path.exists(plan_path)
         if args.planned_idx[0] == args.planned_idx[1] == 0:
             expr_idx_range = "all"
@@ -90,29 +220,62 @@ def main(args):
         args.seed,
         plan_path,
         expr_idx_range,
+        args.doe_random_stratify,
+        args.covering_strength,
+        args.doe_adaptive_batch,
     )
 
-    if args.planned_idx is None:
+    if plan_path is None:
         root_logger.info("No plan exists. Save plan.")
-        doe_manager.save_doe_plan(program_space)
+        doe_manager.save_doe_plan(program_space, args.data_format)
         root_logger.info("Plan saved.")
 
-    root_logger.info("Start iteration.")
-    factor = doe_manager.get_next_factor()
-    while factor is not None:
-        root_logger.info("Iter idx: {}, Qsize: {}".format(iter_cnt, doe_manager.qsize))
+    if args.stop_window > 0:
+        monitor = ConvergenceMonitor(
+            response_manager.num_test,
+            response_manager.num_crit,
+            args.stop_interval,
+            args.stop_window,
+            get_deletable_mask(factor_manager),
+        )
+    else:
+        monitor = None
 
-        root_logger.info("Curr factor: {}".format(factor))
-        program_path = factor_manager.create_program(factor, iter_cnt, args.save_generated)
-        response = response_manager.get_response(program_path, args.save_log)
-        root_logger.info("Response: {}".format(response))
-        doe_manager.append(factor, response)
-        factor = doe_manager.get_next_factor()
+    root_logger.info("Start iteration.")
+    journal = Journal(journal_path, factor_manager.size, response_manager.size, args.journal_sync)
+    executor = get_executor(
+        factor_manager,
+        response_manager,
+        args.save_generated,
+        args.save_log,
+        args.jobs,
+        args.pipeline,
+        args.queue_size,
+        journal,
+        monitor,
+    )
+    if resume:
+        root_logger.info(
+            "Replayed {} observations from the journal({}).".format(
+                executor.replay(doe_manager), journal_path
+            )
+        )
+    try:
+        iter_cnt = executor.run(doe_manager, iter_cnt)
+    finally:
+        journal.close()
+        factor_manager.close()
+    response_manager.log_cache_statistics()
 
-        iter_cnt += 1
+    stopped = monitor is not None and monitor.converged
+    if (doe_manager.adaptive or stopped) and args.planned_idx is None:
+        # The saved plan has the initial factors only, or factors left unexecuted
+        root_logger.info("Save the executed plan.")
+        doe_manager.save_executed_plan(program_space, args.data_format)
 
     root_logger.info("End iteration. Save model.")
-    doe_manager.save_model(program_space)
+    doe_manager.save_model(program_space, args.data_format)
+    journal.remove()
     root_logger.info("Model saved. End program.")
 
 
@@ -6,7 +6,15 @@ import glob
 from dm.program_space import ProgramSpace
 from dm.factor.factor import get_factor_manager
 from dm.response_manager import ResponseManager
+from dm.response_store import ResponseStore
+from dm.doe import data_file
 from dm.log import add_outputpath_log_handler
+from dm.inference import (
+    get_response_idx_list,
+    getXy,
+    get_factor_once_success,
+    get_factor_individual_bayesian,
+)
 
 from sklearn.linear_model import LogisticRegression
 
@@ -47,6 +55,31 @@ def get_parser():
         "--output_path", help="Explicitly state out the output path", default=None,
     )
     parser.add_argument("--seed", type=int, help="Numpy random seed", default=None)
+    parser.add_argument(
+        "--response_store",
+        help="Share responses across runs through the on-disk response store",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--response_store_size",
+        help="Maximum number of responses kept in the response store",
+        type=int,
+        default=100000,
+    )
+    parser.add_argument(
+        "--no_parse_cache",
+        help="Parse the sources again instead of loading the srcML trees from the parse cache",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--unit_artifacts",
+        help="Generate the srcML unit artifacts before the experiments (sync), "
+        "on a background process (background), or not at all (skip)",
+        choices=["sync", "background", "skip"],
+        default="sync",
+    )
     return parser
 
 
@@ -81,23 +114,6 @@ def get_response(data, response_size) -> np.ndarray:
         return np_data[:, -response_size:]
 
 
-def get_factor_once_success(sample_data, factor_size, test_idx_list) -> np.ndarray:
-    test_succ_row_list = list(
-        filter(lambda row: np.bitwise_and.reduce(row[test_idx_list], 0), sample_data,)
-    )
-    if len(test_succ_row_list) == 0:
-        return np.array([False] * factor_size)
-    else:
-        return get_factor(np.bitwise_or.reduce(test_succ_row_list, 0), factor_size)
-
-
-def getXy(sample_data, factor_size, test_idx_list) -> (np.ndarray, np.ndarray):
-    return (
-        sample_data[:, :factor_size],
-        np.bitwise_and.reduce(sample_data[:, test_idx_list], 1),
-    )
-
-
 def get_factor_logistic_regression(sample_data, factor_size, test_idx_list) -> np.ndarray:
     X, y = getXy(sample_data, factor_size, test_idx_list)
     if len(set(y)) == 1:
@@ -109,21 +125,6 @@ def get_factor_logistic_regression(sample_data, factor_size, test_idx_list) -> n
     return np.array(list(map(lambda x: 1 if x > 0 else 0, clf.coef_[0])))
 
 
-# p(Response=1|Factor=1) = p(Response=1 && Factor=1) / p(Factor=1)
-def get_factor_individual_bayesian(sample_data, factor_size, test_idx_list) -> np.ndarray:
-    X, y = getXy(sample_data, factor_size, test_idx_list)
-    factor_prop = []
-    count_factor_1 = np.count_nonzero(X, axis=0)
-    for factor_idx in range(len(X[0])):
-        factor_col = X[:, factor_idx]
-        count_factor_1_response_1 = np.count_nonzero(np.logical_and(factor_col, y))
-        assert count_factor_1_response_1 <= count_factor_1[factor_idx]
-        factor_prop.append(count_factor_1_response_1 / count_factor_1[factor_idx])
-    logger.debug(", ".join(list(map(lambda x: "{:.2f}".format(x), factor_prop))))
-    factor_prop = np.array(factor_prop)
-    return factor_prop > np.mean(factor_prop)
-
-
 def check_factor_sample(
     factor_manager, response_manager, factor, save_generated, save_log, raw_idx
 ) -> np.ndarray:
@@ -132,26 +133,20 @@ def check_factor_sample(
 
 
 def get_data(data_dir_path, sub_sample: float):
-    data_path_list = sorted(
-        list(
-            filter(
-                lambda x: os.path.basename(x).startswith("expr"),
-                glob.glob(os.path.join(data_dir_path, "*")),
-            )
-        )
-    )
+    data_path_dict = {}
+    for data_path in sorted(glob.glob(os.path.join(data_dir_path, "expr*"))):
+        stem, ext = os.path.splitext(data_path)
+        # A converted file (.bits) is preferred to its CSV
+        if ext == ".bits" or (ext == ".csv" and stem not in data_path_dict):
+            data_path_dict[stem] = data_path
+    data_path_list = [data_path_dict[stem] for stem in sorted(data_path_dict)]
     logger.debug("data_path_list: {}".format(data_path_list))
-    data_path = data_path_list[0]
-    with open(data_path) as f:
-        logger.info(f.readline().lstrip("# ").rstrip())
-    data = np.genfromtxt(data_path, delimiter=",", skip_header=1).astype(bool)
-
-    for data_path in data_path_list[1:]:
-        with open(data_path) as f:
-            logger.info(f.readline().lstrip("# ").rstrip())
-        data = np.vstack(
-            (data, np.genfromtxt(data_path, delimiter=",", skip_header=1).astype(bool),)
-        )
+    data_list = []
+    for data_path in data_path_list:
+        columns, _, rows = data_file.load_data(data_path)
+        logger.info(",".join(columns))
+        data_list.append(rows[:].view(bool))
+    data = np.concatenate(data_list)
     logger.info("expr_cnt: {}".format(len(data)))
     sample_size = int(len(data) * sub_sample)
     logger.info("sub_sample: {}, sample_size: {}".format(sub_sample, sample_size))
@@ -171,7 +166,7 @@ def infer_factor(
     save_generated,
     save_log,
 ):
-    response_idx_list = np.array(range(num_test)) * num_crit + raw_idx + 1
+    response_idx_list = get_response_idx_list(num_test, num_crit, raw_idx)
     vector_idx_list = factor_manager.size + response_idx_list
     logger.info(
         "Criterion {} ({}): response_idx_list:{}, vector_idx_list:{}".format(
@@ -227,8 +222,14 @@ if __name__ == "__main__":
 
     logger.info("output_path: {}".format(output_path))
 
-    factor_manager = get_factor_manager("srcml", args.proj_name, program_space)
-    response_manager = ResponseManager(program_space)
+    factor_manager = get_factor_manager(
+        "srcml", args.proj_name, program_space, not args.no_parse_cache, args.unit_artifacts
+    )
+    if args.response_store:
+        response_store = ResponseStore(program_space, args.response_store_size)
+    else:
+        response_store = None
+    response_manager = ResponseManager(program_space, response_store)
     data_dir_path = os.path.join("output", "experiment", args.proj_name, args.data_name)
     data = get_data(data_dir_path, args.sub_sample)
     criteria_list = get_criteria(args.proj_name)
@@ -260,3 +261,5 @@ if __name__ == "__main__":
         )
 
     logger.info("success rate: {}".format(np.mean(succ_list)))
+    response_manager.log_cache_statistics()
+    factor_manager.close()
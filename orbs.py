@@ -0,0 +1,126 @@
+from dm.program_space import ProgramSpace
+from dm.factor.factor import get_factor_manager
+from dm.response_manager import ResponseManager
+from dm.response_store import ResponseStore
+from dm.orbs import OrbsSlicer
+from dm.doe import data_file
+from dm.log import create_root_logger, add_outputpath_log_handler
+import argparse
+import logging
+import os
+
+create_root_logger()
+root_logger = logging.getLogger()
+
+
+def get_parser():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-p", "--proj_name", help="Target project name", required=True)
+    parser.add_argument(
+        "-f", "--factor_level", help="Factor level", choices=["line", "srcml"], default="line"
+    )
+    parser.add_argument(
+        "-o", "--output_name", help="Output(slice) saving folder name", default="orbs"
+    )
+    parser.add_argument(
+        "-w", "--window", help="Maximum number of the factors deleted at once", type=int, default=3
+    )
+    parser.add_argument(
+        "-c",
+        "--criteria",
+        help="Index of the slicing criteria (from 1), every criterion by default",
+        type=int,
+        nargs="+",
+        default=None,
+    )
+    parser.add_argument(
+        "-j", "--jobs", help="Number of deletions tested in parallel", type=int, default=1
+    )
+    parser.add_argument(
+        "--save_generated", help="Save all generated programs", action="store_true", default=False
+    )
+    parser.add_argument("--save_log", help="Save log", action="store_true", default=False)
+    parser.add_argument(
+        "--response_store",
+        help="Share responses across runs through the on-disk response store",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--response_store_size",
+        help="Maximum number of responses kept in the response store",
+        type=int,
+        default=100000,
+    )
+    parser.add_argument(
+        "--no_parse_cache",
+        help="Parse the sources again instead of loading the srcML trees from the parse cache",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--unit_artifacts",
+        help="Generate the srcML unit artifacts before the experiments (sync), "
+        "on a background process (background), or not at all (skip)",
+        choices=["sync", "background", "skip"],
+        default="sync",
+    )
+    parser.add_argument(
+        "--data_format",
+        help="Format of the slice file: CSV (csv) or packed bits (bits)",
+        choices=["csv", "bits"],
+        default="csv",
+    )
+    return parser
+
+
+def main(args):
+    root_logger.info("Create initial objects.")
+    program_space = ProgramSpace(args.proj_name)
+    program_space.base_work_dir = os.path.join("output", "orbs", args.proj_name, args.output_name)
+    add_outputpath_log_handler(program_space.base_work_dir, root_logger)
+    factor_manager = get_factor_manager(
+        args.factor_level,
+        args.proj_name,
+        program_space,
+        not args.no_parse_cache,
+        args.unit_artifacts,
+    )
+    if args.response_store:
+        response_store = ResponseStore(program_space, args.response_store_size)
+    else:
+        response_store = None
+    response_manager = ResponseManager(program_space, response_store)
+    if args.criteria is None:
+        crit_idx_list = None
+    else:
+        for criterion in args.criteria:
+            if not 1 <= criterion <= program_space.num_crit:
+                raise Exception("Invalid criteria({})".format(criterion))
+        crit_idx_list = [criterion - 1 for criterion in args.criteria]
+
+    root_logger.info("Start slicing.")
+    slicer = OrbsSlicer(
+        factor_manager,
+        response_manager,
+        args.window,
+        crit_idx_list,
+        args.save_generated,
+        args.save_log,
+        args.jobs,
+    )
+    deleted = slicer.run()
+    response_manager.log_cache_statistics()
+    factor_manager.close()
+
+    root_logger.info("End slicing. Save slice.")
+    slice_path = os.path.join(program_space.base_work_dir, "slice." + args.data_format)
+    data_file.save_data(slice_path, [deleted], data_file.get_plan_columns(factor_manager.size))
+    program_path = factor_manager.create_program(deleted.astype(int).tolist(), "slice", True)
+    root_logger.info("Slice saved(path: {}, program: {}).".format(slice_path, program_path))
+
+
+if __name__ == "__main__":
+    parser = get_parser()
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,113 @@
+import numpy as np
+from dm.convergence import ConvergenceMonitor, get_deletable_mask
+from dm.doe.onehot_doe_manager import OneHotDoEManager
+from dm.doe.one2nhot_doe_manager import One2NHotDoEManager
+from dm.doe.random_doe_manager import RandomDoEManager
+from dm.factor.factor_manager import FactorManager
+
+
+class FakeFactorManager(FactorManager):
+    def __init__(self, size, invalid=()):
+        self._factor = list(range(size))
+        self._size = size
+        # Factors which can not be deleted (as the decl or return stmts)
+        self._invalid = np.zeros(size, dtype=bool)
+        self._invalid[list(invalid)] = True
+
+    def create_program(self, factor, iter_cnt, save_flag, only_code=False, work_name="work"):
+        raise Exception("Invalid call(create_program)")
+
+    def is_valid_factor(self, factor):
+        return not np.any(np.asarray(factor, dtype=bool) & self._invalid)
+
+    def valid_factors(self, factors):
+        return ~np.any(np.asarray(factors, dtype=bool) & self._invalid, axis=1)
+
+
+class FakeResponseManager:
+    # Compilation, and one test of one criterion
+    size = 2
+    num_test = 1
+    num_crit = 1
+
+
+def run_campaign(doe_manager, monitor, relevant):
+    """
+    Observe the planned factors as the executor does: the test fails when a
+    relevant factor is deleted
+    """
+    while True:
+        factor = doe_manager.get_next_factor()
+        if factor is None:
+            break
+        response = [True, not np.any(np.asarray(factor, dtype=bool) & relevant)]
+        doe_manager.append(factor, response)
+        monitor.update(doe_manager)
+
+
+def test_onehot_not_stopped_before_every_factor_is_deleted():
+    factor_size = 60
+    relevant = np.zeros(factor_size, dtype=bool)
+    relevant[5:45] = True
+    factor_manager = FakeFactorManager(factor_size)
+    doe_manager = OneHotDoEManager(factor_manager, FakeResponseManager, factor_size + 1)
+    monitor = ConvergenceMonitor(1, 1, 5, 20)
+    run_campaign(doe_manager, monitor, relevant)
+
+    assert not monitor.converged
+    assert doe_manager.observed_cnt == factor_size + 1
+    factors, _ = doe_manager.get_observations()
+    assert np.all(np.any(factors, axis=0))
+
+
+def test_random_stopped_once_slices_are_unchanged():
+    factor_size = 20
+    relevant = np.zeros(factor_size, dtype=bool)
+    relevant[5:10] = True
+    factor_manager = FakeFactorManager(factor_size)
+    doe_manager = RandomDoEManager(factor_manager, FakeResponseManager, 2000, 0.2, seed=1)
+    monitor = ConvergenceMonitor(1, 1, 10, 100)
+    run_campaign(doe_manager, monitor, relevant)
+
+    assert monitor.converged
+    assert doe_manager.observed_cnt < 2000
+    factors, responses = doe_manager.get_observations()
+    assert np.all(np.any(factors, axis=0))
+    # The deletable factors are the ones deleted by some successful observation
+    once_success = np.any(factors[np.all(responses, axis=1)], axis=0).astype(bool)
+    assert np.array_equal(once_success, ~relevant)
+
+
+def test_nhot_stopped_with_factors_never_deletable():
+    factor_size = 20
+    relevant = np.zeros(factor_size, dtype=bool)
+    relevant[5:10] = True
+    factor_manager = FakeFactorManager(factor_size, invalid=range(3))
+    doe_manager = One2NHotDoEManager(factor_manager, FakeResponseManager, 1000, 2)
+    deletable = get_deletable_mask(factor_manager)
+    assert np.array_equal(np.nonzero(~deletable)[0], [0, 1, 2])
+    monitor = ConvergenceMonitor(1, 1, 10, 50, deletable)
+    run_campaign(doe_manager, monitor, relevant)
+
+    assert monitor.converged
+    assert doe_manager.observed_cnt < 1 + 17 + 17 * 16 // 2
+    factors, _ = doe_manager.get_observations()
+    assert not np.any(factors[:, ~deletable])
+    assert np.all(np.any(factors[:, deletable], axis=0))
+
+
+def test_simple_bayes_ignores_factors_never_deleted():
+    factor_size = 20
+    relevant = np.zeros(factor_size, dtype=bool)
+    relevant[5:10] = True
+    factor_manager = FakeFactorManager(factor_size, invalid=range(3))
+    doe_manager = One2NHotDoEManager(factor_manager, FakeResponseManager, 1000, 2)
+    deletable = get_deletable_mask(factor_manager)
+    monitor = ConvergenceMonitor(1, 1, 10, 50, deletable)
+    run_campaign(doe_manager, monitor, relevant)
+
+    factors, responses = doe_manager.get_observations()
+    slices = monitor.get_slices(factors, responses)
+    # The factors never deleted do not make the simple_bayes slice empty
+    assert np.array_equal(slices[0, 1], deletable & ~relevant)
+    assert np.array_equal(slices[0, 0], deletable & ~relevant)